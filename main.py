@@ -1,57 +1,151 @@
 import sys
 import os
+import ast
 import ctypes
-import signal
+import functools
+import hashlib
+import json
 import re
+import signal
 import subprocess
 import importlib
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+# Keep pip from flashing a console window when launched from a GUI/frozen build
+NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
 
 # -------------------------
 # Utility: Check if pip is available
 # -------------------------
 def has_pip():
     try:
-        subprocess.check_call(
+        if importlib.util.find_spec("pip") is not None:
+            return True
+    except (ImportError, ValueError):
+        pass
+    try:
+        subprocess.run(
             [sys.executable, "-m", "pip", "--version"],
             stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
+            stderr=subprocess.DEVNULL,
+            creationflags=NO_WINDOW,
+            check=True
         )
         return True
     except Exception:
         return False
 
 # -------------------------
-# Optional: Upgrade pip
+# Optional: Upgrade pip (at most once a week)
 # -------------------------
-def upgrade_pip():
+PIP_UPGRADE_INTERVAL = 7 * 24 * 60 * 60
+
+
+def upgrade_pip(stamp_path):
+    try:
+        if time.time() - os.path.getmtime(stamp_path) < PIP_UPGRADE_INTERVAL:
+            return
+    except OSError:
+        pass
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "--upgrade", "pip"])
+        subprocess.run([sys.executable, "-m", "pip", "install", "--upgrade", "pip"], creationflags=NO_WINDOW, check=True)
+        Path(stamp_path).touch()
     except Exception as e:
         print(f"[WARN] Could not upgrade pip: {e}")
 
 # -------------------------
 # Module Import Scanner
 # -------------------------
-def scan_module_imports(directory):
-    found_modules = set()
-    pattern = re.compile(r'^\s*(?:import|from)\s+([a-zA-Z0-9_\.]+)')
+STDLIB_MODULES = getattr(sys, "stdlib_module_names", frozenset()) | frozenset(sys.builtin_module_names)
+LOCAL_PACKAGES = frozenset({'modules', 'main'})
+SCAN_SKIP_DIRS = frozenset({'__pycache__', '.git', 'venv', '.venv', '.mypy_cache', '.pytest_cache', 'build', 'dist'})
+IMPORT_PATTERN = re.compile(rb'^[ \t]*(?:import|from)[ \t]+([a-zA-Z0-9_\.]+)', re.MULTILINE)
+
 
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.py'):
-                path = os.path.join(root, file)
+def _import_scan_cache_path(directory):
+    return os.path.join(os.path.dirname(os.path.abspath(directory)), '.import_scan.cache.json')
+
+
+def _walk_sources(directory):
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
                 try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            match = pattern.match(line)
-                            if match:
-                                base = match.group(1).split('.')[0]
-                                if base and base not in sys.builtin_module_names:
-                                    found_modules.add(base)
-                except Exception as e:
-                    print(f"Warning: Skipped {path} ({e})")
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SCAN_SKIP_DIRS:
+                            yield from _walk_sources(entry.path)
+                    elif entry.name.endswith('.py'):
+                        st = entry.stat()
+                        yield entry.path, st.st_mtime_ns, st.st_size
+                except OSError:
+                    continue
+    except OSError:
+        return
+
+
+def _source_files(directory):
+    return sorted(_walk_sources(directory))
+
+
+def _sources_digest(sources):
+    h = hashlib.blake2b(digest_size=16)
+    for path, mtime_ns, size in sources:
+        h.update(f"{path}\0{mtime_ns}\0{size}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def _imports_from_source(data, path):
+    try:
+        tree = ast.parse(data, filename=path)
+    except SyntaxError:
+        # Source newer than this interpreter: fall back to a line scan over the raw bytes
+        for match in IMPORT_PATTERN.finditer(data):
+            base = match.group(1).split(b'.')[0].decode('ascii')
+            if base:
+                yield base
+        return
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name.split('.')[0]
+        elif isinstance(node, ast.ImportFrom):
+            # Relative imports (from .logger import ...) are always local
+            if node.level == 0 and node.module:
+                yield node.module.split('.')[0]
+
+
+def scan_module_imports(directory):
+    sources = _source_files(directory)
+    digest = _sources_digest(sources)
+    cache_path = _import_scan_cache_path(directory)
+
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('digest') == digest:
+            return list(cached.get('modules', []))
+    except (OSError, ValueError):
+        pass
 
-    return sorted(found_modules)
+    found_modules = set()
+    for path, _, _ in sources:
+        try:
+            for base in _imports_from_source(Path(path).read_bytes(), path):
+                if base not in STDLIB_MODULES and base not in LOCAL_PACKAGES:
+                    found_modules.add(base)
+        except Exception as e:
+            print(f"Warning: Skipped {path} ({e})")
+
+    modules = sorted(found_modules)
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'digest': digest, 'modules': modules}, f)
+    except OSError as e:
+        print(f"[WARN] Could not write import scan cache: {e}")
+    return modules
 
 # -------------------------
 # Module name mapping
@@ -59,6 +153,10 @@ def scan_module_imports(directory):
 PIP_MODULE_MAP = {
     'win32com': 'pywin32',
     'pythoncom': 'pywin32',
+    'win32api': 'pywin32',
+    'win32con': 'pywin32',
+    'win32gui': 'pywin32',
+    'win32gui_struct': 'pywin32',
     'PIL': 'Pillow',
 }
 
@@ -66,20 +164,35 @@ PIP_MODULE_MAP = {
 # Auto-Installer
 # -------------------------
 def ensure_modules_installed(modules):
-    for module in modules:
+    missing = []
+    for module in dict.fromkeys(modules):
+        # Stdlib and already-imported names can never need pip; skip the spec lookup
+        if module in STDLIB_MODULES or module in sys.modules:
+            continue
+        # find_spec only locates the loader; it doesn't execute the package
         try:
-            importlib.import_module(module)
-        except ImportError:
-            pip_name = PIP_MODULE_MAP.get(module, module)
-            print(f"[INFO] Missing module '{module}', installing '{pip_name}'...")
-            try:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", pip_name])
-            except subprocess.CalledProcessError:
-                print(f"[ERROR] Failed to install '{pip_name}'")
+            if importlib.util.find_spec(module) is None:
+                missing.append(module)
+        except (ImportError, ValueError):
+            missing.append(module)
+    if not missing:
+        return
+
+    # One pip run resolves everything at once instead of paying startup per module
+    pip_names = list(dict.fromkeys(PIP_MODULE_MAP.get(m, m) for m in missing))
+    print(f"[INFO] Missing modules {missing}, installing {pip_names}...")
+    try:
+        subprocess.run([
+            sys.executable, "-m", "pip", "install",
+            "--disable-pip-version-check", "--no-input", *pip_names
+        ], creationflags=NO_WINDOW, check=True)
+    except subprocess.CalledProcessError:
+        print(f"[ERROR] Failed to install {pip_names}")
 
 # -------------------------
 # Admin Check & Elevation
 # -------------------------
+@functools.lru_cache(maxsize=1)
 def is_admin():
     try:
         return ctypes.windll.shell32.IsUserAnAdmin()
@@ -98,6 +211,24 @@ def run_as_admin():
         print(f"[ERROR] Failed to elevate: {e}")
         sys.exit(1)
 
+# -------------------------
+# Background pre-import of the GUI stack
+# -------------------------
+def preload_gui_modules():
+    """Import customtkinter/PIL/modules.gui on a worker thread; the caller joins it before building the window."""
+    def load():
+        for name in ('customtkinter', 'modules.gui'):
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                # The real import on the main thread will surface the error
+                print(f"[WARN] Preload of '{name}' failed: {e}")
+                return
+
+    thread = threading.Thread(target=load, name="gui-preload", daemon=True)
+    thread.start()
+    return thread
+
 # -------------------------
 # Main Launcher
 # -------------------------
@@ -111,18 +242,22 @@ if __name__ == "__main__":
 
     if not getattr(sys, 'frozen', False) and has_pip():
         print("[DEBUG] Auto-installing missing dependencies...")
-        upgrade_pip()
+        upgrade_pip(os.path.join(base_dir, '.pip_upgrade.stamp'))
         scanned = scan_module_imports(modules_dir)
         ensure_modules_installed(scanned + ['customtkinter'])
     else:
         print("[INFO] Skipping auto-install (frozen or pip not available)")
 
+    # Overlap the heavy GUI imports with the admin check / UAC prompt
+    preload = preload_gui_modules()
+
     if not is_admin():
         print("[DEBUG] Not admin, elevating...")
         run_as_admin()
 
     print("[DEBUG] Running with admin privileges")
 
+    preload.join()
     import customtkinter as ctk
     from modules.gui import GUI
 
@@ -133,6 +268,11 @@ if __name__ == "__main__":
 
 
 # Build with:
-# pyinstaller --onefile --noconsole --uac-admin --name MAKCU --add-data "assets;assets" --add-data "modules;modules" --add-data "assets/app.manifest;." --add-data "assets/driver;assets/driver" main.py
+# pyinstaller --onefile --noconsole --uac-admin --name MAKCU --add-data "assets;assets" --add-data "assets/app.manifest;." --add-data "assets/driver;assets/driver" main.py
+#
+# Faster-starting folder build (no per-launch unpack to %TEMP%; modules/utils.py
+# reads resources from sys._MEIPASS, which is the _internal folder here).
+# Release builds stay --onefile: the updater ships and swaps a single MAKCU.exe.
+# pyinstaller --onedir --noconsole --uac-admin --name MAKCU --add-data "assets;assets" --add-data "assets/app.manifest;." --add-data "assets/driver;assets/driver" main.py
 
-# $cfg='https://raw.githubusercontent.com/terrafirma2021/MAKCM_v2_files/main/config.json'; $ge='https://gitee.com/terrafirma/MAKCM_v2_files/raw/main/config.json'; try{$j=Invoke-RestMethod -Uri $cfg -TimeoutSec 15 -ErrorAction Stop}catch{ try{$j=Invoke-RestMethod -Uri $ge -TimeoutSec 15 -ErrorAction Stop}catch{Write-Error "Failed to download config.json"; exit 1}} $n=if($j.aio -and $j.aio.name){[string]$j.aio.name}elseif($j.version){'MAKCU_V'+$j.version+'.exe'}else{'MAKCU.exe'}; $base=[IO.Path]::GetFileNameWithoutExtension($n); $i=1; do{$final="$base`_$i"; $i++}while(Test-Path ".\dist\$final.exe"); Write-Host "Building as: $final.exe"; pyinstaller --onefile --noconsole --uac-admin --name $final --add-data "assets;assets" --add-data "modules;modules" --add-data "assets/app.manifest;." --add-data "assets/driver;assets/driver" main.py
+# $cfg='https://raw.githubusercontent.com/terrafirma2021/MAKCM_v2_files/main/config.json'; $ge='https://gitee.com/terrafirma/MAKCM_v2_files/raw/main/config.json'; try{$j=Invoke-RestMethod -Uri $cfg -TimeoutSec 15 -ErrorAction Stop}catch{ try{$j=Invoke-RestMethod -Uri $ge -TimeoutSec 15 -ErrorAction Stop}catch{Write-Error "Failed to download config.json"; exit 1}} $n=if($j.aio -and $j.aio.name){[string]$j.aio.name}elseif($j.version){'MAKCU_V'+$j.version+'.exe'}else{'MAKCU.exe'}; $base=[IO.Path]::GetFileNameWithoutExtension($n); $i=1; do{$final="$base`_$i"; $i++}while(Test-Path ".\dist\$final.exe"); Write-Host "Building as: $final.exe"; pyinstaller --onefile --noconsole --uac-admin --name $final --add-data "assets;assets" --add-data "assets/app.manifest;." --add-data "assets/driver;assets/driver" main.py
@@ -1,16 +1,73 @@
 # config_manager.py
 
-import requests
 import threading
 import os
 import json
 import aiohttp
 import asyncio
 import time
-from tenacity import retry, stop_after_attempt, wait_fixed
+import random
+from collections import namedtuple
+from types import MappingProxyType
 from aiohttp import ContentTypeError
-from ping3 import ping
-from modules.utils import get_main_folder, get_download_path
+from modules.utils import get_main_folder, get_download_dir
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback keeps the app usable without the wheel
+    orjson = None
+
+
+def json_loads(data):
+    """Parse JSON from bytes or str, preferring orjson."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes, preferring orjson."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+
+
+# Network-level failures worth another attempt; disk or parse errors won't fix themselves
+RETRYABLE_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+
+class RetryBudget:
+    """Retry allowance shared by every retry loop working on the same file."""
+
+    def __init__(self, retries):
+        self.remaining = retries
+
+    def take(self):
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+async def retry_async(make_coro, attempts=3, base_delay=0.5, max_delay=4.0, budget=None):
+    """
+    Await make_coro() up to `attempts` times with exponential backoff plus jitter.
+    Only RETRYABLE_ERRORS are retried, and each retry must also be granted by
+    `budget` when one is given.
+    """
+    for attempt in range(attempts):
+        try:
+            return await make_coro()
+        except RETRYABLE_ERRORS:
+            if attempt == attempts - 1 or (budget is not None and not budget.take()):
+                raise
+            await asyncio.sleep(min(base_delay * 2 ** attempt, max_delay) + random.random() * 0.25)
+
+
+# Per-side firmware entry, resolved once in _parse_firmware_info
+FirmwareInfo = namedtuple(
+    "FirmwareInfo", "name filename primary_url fallback_url version changelog"
+)
 
 
 class ConfigManager:
@@ -36,59 +93,145 @@ class ConfigManager:
     FALLBACK_CONFIG_URL = "https://gitee.com/terrafirma/MAKCM_v2_files/raw/main/config.json"
     LOCAL_CONFIG_PATH = os.path.join(get_main_folder(), 'config.json')
     PING_TIMEOUT = 0.5  # 500ms
-
-    def __init__(self, logger, progress_callback=None):
+    MAX_CONNECTIONS = 16
+    MAX_CONNECTIONS_PER_HOST = 8
+    MAX_PARALLEL_BINS = 4
+    WRITE_BATCH_SIZE = 256 * 1024
+    PROGRESS_INTERVAL = 0.033  # ~30 Hz
+    RANGE_CHUNK_SIZE = 512 * 1024
+    RANGE_CONCURRENCY = 4
+    BIN_RETRY_BUDGET = 2  # retries shared by both mirrors for one BIN
+    HEDGE_DELAY = 0.5  # head start for the preferred mirror before racing the other
+    SAVE_DEBOUNCE = 0.25  # coalesce config writes landing within this window
+    JSON_OFFLOAD_THRESHOLD = 64 * 1024  # parse larger config bodies off the event loop
+    SERVER_PROBE_TTL = 6 * 60 * 60  # reuse the last latency probe result for this long
+    # Machine-local keys that survive replacing config_data with a freshly downloaded config
+    LOCAL_ONLY_KEYS = ("window_position", "preferred_server", "preferred_server_ts")
+
+    def __init__(self, logger, progress_callback=None, loop=None):
         self.logger = logger
         self.progress_callback = progress_callback
+        self._pending_progress = {}
+        self._progress_flush_scheduled = False
         self.config_data = {}
-        self.config_lock = threading.Lock()
+        # Writers take config_lock and publish a read-only snapshot; readers use the snapshot lock-free
+        self.config_lock = threading.RLock()
+        self._snapshot = MappingProxyType({})
         self.download_complete = threading.Event()
         self.download_successful = False
         self.is_online = False
         self.bin_file_urls = {}
-        self.side_to_filename = {}
+        self._firmware_by_side = {}
         self.bin_files_downloaded = {}
-        self.preferred_server = self._select_fastest_server()
+        self._firmware_hash = None
+        # Resolved (and created) once; BIN paths are joined onto it from here on
+        self._download_dir = get_download_dir()
+        self._dir_index = {}
+        self._dirty_event = threading.Event()
+        threading.Thread(target=self._save_worker, daemon=True).start()
+        # A caller-supplied running loop is borrowed, never stopped; otherwise we own a private one
+        self._loop = loop
+        self._owns_loop = loop is None
+        self._session = None
+        self.download_future = None
         self.load_local_config()
-        self._parse_firmware_info()
-        threading.Thread(target=self.download_all_files, daemon=True).start()
-
-    @staticmethod
-    def _parse_ping(raw) -> float | None:
-        if raw is None:
-            return None
-        if isinstance(raw, (int, float)):
-            return float(raw)
-        if isinstance(raw, str):
-            s = raw.strip().lower()
-            factor = 1.0
-            if s.endswith("ms"):
-                s = s[:-2].strip()
-                factor = 1 / 1000
-            elif s.endswith("s"):
-                s = s[:-1].strip()
-            try:
-                return float(s) * factor
-            except ValueError:
-                return None
-        return None
+        # Last persisted choice until the download pass re-resolves it
+        self._set_preferred_server(self.get_config_value("preferred_server", "GitHub"))
+        self._parse_firmware_info()  # First call always scans the downloads folder
+        self.start()
+
+    def _get_loop(self):
+        """Event loop for all of ConfigManager's network work: the caller's if given, else a private background one."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._owns_loop = True
+            threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        return self._loop
+
+    def _run_async(self, coro):
+        """Schedule a coroutine on the background loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+
+    def _report(self, filename, status):
+        """
+        Queue a progress update from the background loop. Per-file updates are
+        coalesced (latest status wins) and delivered at most every PROGRESS_INTERVAL;
+        "all" lifecycle events flush the queue and are delivered immediately.
+        """
+        if not self.progress_callback:
+            return
+        if filename == "all":
+            self._flush_progress()
+            self.progress_callback(filename, status)
+            return
+        self._pending_progress.pop(filename, None)
+        self._pending_progress[filename] = status
+        if not self._progress_flush_scheduled:
+            self._progress_flush_scheduled = True
+            asyncio.get_running_loop().call_later(self.PROGRESS_INTERVAL, self._flush_progress)
+
+    def _flush_progress(self):
+        self._progress_flush_scheduled = False
+        pending, self._pending_progress = self._pending_progress, {}
+        for filename, status in pending.items():
+            self.progress_callback(filename, status)
+
+    async def _get_session(self):
+        """Long-lived session so config and BIN fetches share one connection pool."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.MAX_CONNECTIONS,
+                limit_per_host=self.MAX_CONNECTIONS_PER_HOST,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            )
+            # No total cap: a slow but progressing BIN shouldn't be killed, a stalled socket should
+            timeout = aiohttp.ClientTimeout(total=None, sock_connect=5, sock_read=30)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def _close_session(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def close(self, timeout=5):
+        """Flush pending config writes, close the shared HTTP session and stop the background loop. Call on shutdown."""
+        self.flush()
+        if self._loop is None:
+            return
+        try:
+            self._run_async(self._close_session()).result(timeout)
+        except Exception:
+            pass
+        if self._owns_loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    def start(self):
+        """Kick off the config + firmware download without blocking the caller."""
+        self.download_complete.clear()
+        future = self._run_async(self.download_all_files_async())
+        future.add_done_callback(lambda _: self.download_complete.set())
+        self.download_future = future
+        return future
+
+    async def _probe_latency(self, host, port=443):
+        """TCP handshake time to the HTTPS endpoint, in seconds (-1.0 on failure)."""
+        loop = asyncio.get_running_loop()
+        try:
+            start = loop.time()
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=self.PING_TIMEOUT)
+            latency = loop.time() - start
+            writer.close()
+            return latency
+        except Exception:
+            return -1.0
 
-    def _select_fastest_server(self):
+    async def _select_fastest_server(self):
         servers = [("GitHub", "raw.githubusercontent.com"), ("Gitee", "gitee.com")]
-        results = {}
-
-        def safe_ping(name, host):
-            try:
-                latency = self._parse_ping(ping(host, timeout=self.PING_TIMEOUT))
-                results[name] = latency if latency is not None else -1.0
-            except Exception:
-                results[name] = -1.0
-
-        threads = [threading.Thread(target=safe_ping, args=(n, h), daemon=True) for n, h in servers]
-        for t in threads:
-            t.start()
-        for t in threads:
-            t.join()
+        latencies = await asyncio.gather(*(self._probe_latency(host) for _, host in servers))
+        results = {name: latency for (name, _), latency in zip(servers, latencies)}
         valid = {k: v for k, v in results.items() if v >= 0}
         fastest = min(valid, key=valid.get) if valid else "GitHub"
 
@@ -99,23 +242,52 @@ class ConfigManager:
         self.logger.terminal_print(f"Connected to GitHub: {fmt('GitHub')}  Gitee: {fmt('Gitee')}")
         return fastest
 
+    def _set_preferred_server(self, server):
+        """Record the preferred mirror and the (GitHub, Gitee) index order every URL pair is tried in."""
+        self.preferred_server = server
+        self._mirror_order = (1, 0) if server == "Gitee" else (0, 1)
+
+    async def _resolve_preferred_server(self):
+        """Cached mirror choice while it is fresh, otherwise probe again and remember the result."""
+        cached = self.get_config_value("preferred_server")
+        age = time.time() - self.get_config_value("preferred_server_ts", 0)
+        if cached in ("GitHub", "Gitee") and 0 <= age < self.SERVER_PROBE_TTL:
+            self.logger.terminal_print(f"Using cached server preference: {cached}")
+            return cached
+        fastest = await self._select_fastest_server()
+        with self.config_lock:
+            self.config_data["preferred_server"] = fastest
+            self.config_data["preferred_server_ts"] = time.time()
+            self._publish_snapshot()
+            self._schedule_save()
+        return fastest
+
     def load_local_config(self):
         if os.path.exists(self.LOCAL_CONFIG_PATH):
             try:
-                with open(self.LOCAL_CONFIG_PATH, 'r', encoding="utf-8") as f:
-                    with self.config_lock:
-                        self.config_data = json.load(f)
-                        self.download_successful = True
-                        self.is_online = self.config_data.get("is_online", False)
+                with open(self.LOCAL_CONFIG_PATH, 'rb') as f:
+                    data = f.read()
+                with self.config_lock:
+                    self.config_data = json_loads(data)
+                    self.download_successful = True
+                    self.is_online = self.config_data.get("is_online", False)
+                    self._publish_snapshot()
             except Exception:
                 pass
 
     def _parse_firmware_info(self):
         firmware = self.config_data.get("firmware", {}) or {}
-        # reset each time so stale filenames (e.g., V3.2) don't linger
-        self.bin_file_urls = {}
-        self.side_to_filename = {}
-        self.bin_files_downloaded = {}
+        # Skip the rebuild (and the directory scan) when the firmware section is unchanged
+        firmware_hash = hash(json_dumps(firmware))
+        if firmware_hash == self._firmware_hash:
+            return
+        self._firmware_hash = firmware_hash
+        # rebuilt from scratch each time so stale filenames (e.g., V3.2) don't linger
+        bin_file_urls = {}
+        firmware_by_side = {}
+        bin_files_downloaded = {}
+        self._refresh_dir_index()
+        existing = self._dir_index
         for side, info in firmware.items():
             info = info or {}
             primary_url = info.get("primary_url")
@@ -126,189 +298,436 @@ class ConfigManager:
             if not base or not str(base).strip():
                 base = os.path.basename(primary_url)
             filename = base if str(base).lower().endswith(".bin") else f"{base}.bin"
-            self.bin_file_urls[filename] = {"primary": primary_url, "fallback": fallback_url}
-            self.side_to_filename[side] = filename
-            self.bin_files_downloaded[filename] = self._is_valid_file(get_download_path(filename))
+            name = info.get("name")
+            if not name or not str(name).strip():
+                name = filename[:-4] if filename.lower().endswith(".bin") else filename
+            bin_file_urls[filename] = {"primary": primary_url, "fallback": fallback_url}
+            firmware_by_side[side] = FirmwareInfo(
+                name, filename, primary_url, fallback_url,
+                str(info.get("version", "")).strip(), tuple(info.get("changelog", []) or ()),
+            )
+            bin_files_downloaded[filename] = existing.get(filename, 0) > 0
+        self.bin_file_urls = bin_file_urls
+        self._firmware_by_side = firmware_by_side
+        self.bin_files_downloaded = bin_files_downloaded
+
+    def _scan_download_sizes(self):
+        """One directory read instead of a stat per firmware file: {name: size}."""
+        sizes = {}
+        try:
+            with os.scandir(self._download_dir) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file():
+                            sizes[entry.name] = entry.stat().st_size
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return sizes
+
+    def _refresh_dir_index(self):
+        self._dir_index = self._scan_download_sizes()
+
+    def _refresh_index_entry(self, filename):
+        """Re-stat one file into the directory index instead of rescanning the folder."""
+        try:
+            self._dir_index[filename] = os.stat(os.path.join(self._download_dir, filename)).st_size
+        except OSError:
+            self._dir_index.pop(filename, None)
 
     def _is_valid_file(self, filepath):
-        return os.path.exists(filepath) and os.path.getsize(filepath) > 0
+        """Non-empty file in the downloads folder, answered from the cached directory index."""
+        return self._dir_index.get(os.path.basename(filepath), 0) > 0
+
+    async def _ranged_size(self, session, url):
+        """
+        HEAD the URL; return its size if the server accepts byte ranges and the
+        file is big enough to be worth splitting, else None.
+        """
+        try:
+            async with session.head(url, allow_redirects=True) as resp:
+                if resp.status != 200 or resp.headers.get("Accept-Ranges", "").lower() != "bytes":
+                    return None
+                if resp.headers.get("Content-Encoding", "identity").lower() != "identity":
+                    return None
+                size = int(resp.headers.get("Content-Length", 0))
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            return None
+        return size if size > self.RANGE_CHUNK_SIZE else None
+
+    async def _fetch_ranges(self, session, url, part_path, size, receiving):
+        """Fetch `size` bytes as concurrent Range GETs written into a pre-sized file."""
+        def preallocate():
+            f = open(part_path, 'wb', buffering=0)
+            f.truncate(size)
+            return f
+
+        # One handle for the whole file; seek+write pairs are serialized by the lock
+        write_lock = threading.Lock()
+        closed = False
+
+        def write_at(offset, data):
+            with write_lock:
+                # A write still in the thread pool when its task was cancelled must
+                # not touch the handle (or a reused fd) after close
+                if closed:
+                    return
+                f.seek(offset)
+                f.write(data)
+
+        def close():
+            nonlocal closed
+            with write_lock:
+                closed = True
+                f.close()
+
+        f = await asyncio.to_thread(preallocate)
+        try:
+            await self._fetch_range_parts(session, url, size, receiving, write_at)
+        finally:
+            await asyncio.to_thread(close)
+
+    async def _fetch_range_parts(self, session, url, size, receiving, write_at):
+        sem = asyncio.Semaphore(self.RANGE_CONCURRENCY)
+
+        async def fetch_range(lo, hi):
+            async with sem:
+                async with session.get(url, headers={"Range": f"bytes={lo}-{hi}"}) as resp:
+                    if resp.status != 206:
+                        raise aiohttp.ClientResponseError(
+                            resp.request_info, resp.history, status=resp.status,
+                            message="Range request not honoured")
+                    # The mirror is answering; tell the hedge before the body trickles in
+                    receiving.set()
+                    data = await resp.read()
+                if len(data) != hi - lo + 1:
+                    raise aiohttp.ClientPayloadError(f"Short range read at {lo}")
+                await asyncio.to_thread(write_at, lo, data)
+
+        tasks = [
+            asyncio.create_task(fetch_range(lo, min(lo + self.RANGE_CHUNK_SIZE, size) - 1))
+            for lo in range(0, size, self.RANGE_CHUNK_SIZE)
+        ]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            # First failure (or our own cancellation) stops the sibling GETs before the
+            # caller closes the file or retries
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
 
     async def download_file_async(self, session, filename, primary_url, fallback_url):
-        bin_path = get_download_path(filename)
-        os.makedirs(os.path.dirname(bin_path), exist_ok=True)
+        bin_path = self.get_bin_path(filename)
+        os.makedirs(self._download_dir, exist_ok=True)
 
         if self._is_valid_file(bin_path):
-            if self.progress_callback:
-                self.progress_callback(filename, "skipped")
-            return self.config_data.get("last_successful_server", "github")
-
-        @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-        async def fetch(url):
-            async with session.get(url, timeout=10) as resp:
+            self._report(filename, "skipped")
+            return self.get_config_value("last_successful_server", "github")
+
+        async def fetch(url, part_path, receiving):
+            size = await self._ranged_size(session, url)
+            if size:
+                await self._fetch_ranges(session, url, part_path, size, receiving)
+                return True
+            async with session.get(url) as resp:
                 resp.raise_for_status()
-                with open(bin_path, 'wb') as f:
-                    async for chunk in resp.content.iter_chunked(8192):
-                        f.write(chunk)
+                # Take whatever the socket has buffered, pack it into one reusable
+                # WRITE_BATCH_SIZE buffer and hand full buffers to the threadpool
+                f = await asyncio.to_thread(open, part_path, 'wb', buffering=0)
+                try:
+                    buf = bytearray(self.WRITE_BATCH_SIZE)
+                    view = memoryview(buf)
+                    filled = 0
+                    while True:
+                        chunk = await resp.content.readany()
+                        if not chunk:
+                            break
+                        receiving.set()
+                        if filled + len(chunk) > len(buf):
+                            await asyncio.to_thread(f.write, view[:filled])
+                            filled = 0
+                        if len(chunk) >= len(buf):
+                            await asyncio.to_thread(f.write, chunk)
+                            continue
+                        view[filled:filled + len(chunk)] = chunk
+                        filled += len(chunk)
+                    if filled:
+                        await asyncio.to_thread(f.write, view[:filled])
+                finally:
+                    await asyncio.to_thread(f.close)
             return True
 
-        urls = [(primary_url, "GitHub"), (fallback_url, "Gitee")]
-        if self.preferred_server == "Gitee":
-            urls.reverse()
+        urls = ((primary_url, "GitHub"), (fallback_url, "Gitee"))
+
+        # Hedged request: the preferred mirror gets a head start, the other one is only
+        # launched if no bytes have arrived by HEDGE_DELAY (or the preferred one fails).
+        # Each writes its own .part file and the winner is renamed in place.
+        tasks = {}
+        queued = [urls[i] for i in self._mirror_order]
+        # Each mirror gets its first attempt; retries across both come from one shared pool
+        budget = RetryBudget(self.BIN_RETRY_BUDGET)
+
+        def launch_next():
+            url, server = queued.pop(0)
+            part_path = f"{bin_path}.{server.lower()}.part"
+            receiving = asyncio.Event()
+            task = asyncio.create_task(retry_async(lambda: fetch(url, part_path, receiving), budget=budget))
+            tasks[task] = (server, part_path)
+            return task, receiving
+
+        first_task, first_receiving = launch_next()
+        try:
+            await asyncio.wait_for(first_receiving.wait(), self.HEDGE_DELAY)
+        except asyncio.TimeoutError:
+            pass
+        # A preferred mirror that already finished cleanly needs no hedge
+        first_failed = first_task.done() and (first_task.cancelled() or first_task.exception() is not None)
+        if not first_receiving.is_set() or first_failed:
+            launch_next()
 
-        for url, server in urls:
-            try:
-                await fetch(url)
-                if self.progress_callback:
-                    self.progress_callback(filename, "success")
-                return server.lower()
-            except Exception:
-                if self.progress_callback:
-                    self.progress_callback(filename, "failed")
+        winner = None
+        pending = set(tasks)
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if winner is None and not task.cancelled() and task.exception() is None:
+                        winner = tasks[task]
+                if winner is None and not pending and queued:
+                    pending.add(launch_next()[0])
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        try:
+            if winner:
+                os.replace(winner[1], bin_path)
+                self._refresh_index_entry(filename)
+        finally:
+            for _, part_path in tasks.values():
+                try:
+                    os.remove(part_path)
+                except OSError:
+                    pass
+
+        if winner:
+            self._report(filename, "success")
+            return winner[0].lower()
+        self._report(filename, "failed")
         return None
 
     async def download_all_files_async(self):
         start_time = time.time()
-        if self.progress_callback:
-            self.progress_callback("all", "starting")
-
-        async with aiohttp.ClientSession() as session:
-            @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-            async def fetch_config(url):
-                async with session.get(url, timeout=10) as resp:
-                    resp.raise_for_status()
-                    # Accept JSON even if served as text/plain
-                    try:
-                        _ = resp.content_type  # touch for clarity
-                    except Exception:
-                        pass
-                    text = await resp.text(encoding='utf-8')
-                    return json.loads(text)
-
-            config_urls = [
-                (self.PRIMARY_CONFIG_URL, "GitHub"),
-                (self.FALLBACK_CONFIG_URL, "Gitee")
-            ]
-            if self.preferred_server == "Gitee":
-                config_urls.reverse()
-
-            fetched = False
-            for url, server in config_urls:
-                try:
-                    new_cfg = await fetch_config(url)
-                    with self.config_lock:
-                        keep_window = self.config_data.get("window_position")
-                        self.config_data = new_cfg or {}
-                        if keep_window:
-                            self.config_data["window_position"] = keep_window
-                        self.download_successful = True
-                        self.is_online = True
-                        self.config_data["is_online"] = True
-                        self.config_data["last_successful_server"] = server.lower()
-                        self._parse_firmware_info()
-                        self.save_config_to_file()
-                    if self.progress_callback:
-                        self.progress_callback("config.json", "success")
-                    fetched = True
-                    break
-                except Exception:
-                    continue
-
-            if not fetched:
-                with self.config_lock:
-                    self.is_online = False
-                    self.config_data["is_online"] = False
-                    self._parse_firmware_info()
-                    self.save_config_to_file()
-                if self.progress_callback:
-                    self.progress_callback("config.json", "failed")
+        self._report("all", "starting")
+        self._set_preferred_server(await self._resolve_preferred_server())
+
+        session = await self._get_session()
+
+        etag = self.get_config_value("_etag")
 
-            # Debug-plan log of what we’ll download
+        async def fetch_config(url):
+            """Return (config, etag), or (None, etag) when the server says 304 Not Modified."""
+            headers = {"If-None-Match": etag} if etag else None
+            async with session.get(url, timeout=10, headers=headers) as resp:
+                if resp.status == 304:
+                    return None, etag
+                resp.raise_for_status()
+                # Accept JSON even if served as text/plain; parse the raw bytes directly
+                body = await resp.read()
+            if len(body) > self.JSON_OFFLOAD_THRESHOLD:
+                return await asyncio.to_thread(json_loads, body), resp.headers.get("ETag")
+            return json_loads(body), resp.headers.get("ETag")
+
+        config_urls = (
+            (self.PRIMARY_CONFIG_URL, "GitHub"),
+            (self.FALLBACK_CONFIG_URL, "Gitee")
+        )
+
+        fetched = False
+        for url, server in (config_urls[i] for i in self._mirror_order):
             try:
+                new_cfg, new_etag = await retry_async(lambda: fetch_config(url))
                 with self.config_lock:
-                    dbg_files = list(self.bin_file_urls.keys())
-                if self.progress_callback:
-                    for fn in dbg_files:
-                        self.progress_callback(f"plan:{fn}", "info")
+                    if new_cfg is not None:
+                        keep = {k: self.config_data[k] for k in self.LOCAL_ONLY_KEYS if self.config_data.get(k)}
+                        self.config_data = new_cfg or {}
+                        self.config_data.update(keep)
+                        if new_etag:
+                            self.config_data["_etag"] = new_etag
+                    self.download_successful = True
+                    self.is_online = True
+                    self.config_data["is_online"] = True
+                    self.config_data["last_successful_server"] = server.lower()
+                    self._parse_firmware_info()
+                    self._publish_snapshot()
+                    self._schedule_save()
+                self._report("config.json", "success")
+                fetched = True
+                break
             except Exception:
-                pass
-
-            # Firmware bin downloads
-            tasks = []
-            for filename, urls in self.bin_file_urls.items():
-                tasks.append(self.download_file_async(session, filename, urls["primary"], urls["fallback"]))
+                continue
 
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+        if not fetched:
             with self.config_lock:
-                for filename, result in zip(self.bin_file_urls.keys(), results):
-                    ok = isinstance(result, str)
-                    self.bin_files_downloaded[filename] = ok
-                    if ok:
-                        self.config_data["last_successful_server"] = result
-                self.is_online = any(self.bin_files_downloaded.values()) or self.download_successful
-                self.config_data["is_online"] = self.is_online
-                self.save_config_to_file()
+                self.is_online = False
+                self.config_data["is_online"] = False
+                self._parse_firmware_info()
+                self._publish_snapshot()
+                self._schedule_save()
+            self._report("config.json", "failed")
+
+        # Debug-plan log of what we’ll download
+        try:
+            with self.config_lock:
+                dbg_files = list(self.bin_file_urls.keys())
+            for fn in dbg_files:
+                self._report(f"plan:{fn}", "info")
+        except Exception:
+            pass
+
+        # Firmware bin downloads, at most MAX_PARALLEL_BINS files in flight
+        sem = asyncio.Semaphore(self.MAX_PARALLEL_BINS)
 
-        if self.progress_callback:
-            self.progress_callback("all", "complete")
+        async def bounded(filename, urls):
+            async with sem:
+                return await self.download_file_async(session, filename, urls["primary"], urls["fallback"])
+
+        results = await asyncio.gather(
+            *(bounded(filename, urls) for filename, urls in self.bin_file_urls.items()),
+            return_exceptions=True,
+        )
+        with self.config_lock:
+            downloaded = dict(self.bin_files_downloaded)
+            for filename, result in zip(self.bin_file_urls.keys(), results):
+                ok = isinstance(result, str)
+                downloaded[filename] = ok
+                if ok:
+                    self.config_data["last_successful_server"] = result
+            self.bin_files_downloaded = downloaded
+            self.is_online = any(downloaded.values()) or self.download_successful
+            self.config_data["is_online"] = self.is_online
+            self._publish_snapshot()
+            self._schedule_save()
+
+        self._report("all", "complete")
+
+    async def fetch_bin(self, side):
+        """
+        Download the firmware BIN for `side` over the shared session.
+        Returns the local path on success, None otherwise.
+        """
+        info = self._firmware_by_side.get(side)
+        if info is None:
+            return None
+        filename = info.filename
+        # User-triggered: re-check the file in case it was removed behind our back
+        self._refresh_index_entry(filename)
+        session = await self._get_session()
+        server = await self.download_file_async(session, filename, info.primary_url, info.fallback_url)
+        with self.config_lock:
+            downloaded = dict(self.bin_files_downloaded)
+            downloaded[filename] = server is not None
+            self.bin_files_downloaded = downloaded
+            if server:
+                self.config_data["last_successful_server"] = server
+                # Only a success updates reachability; one failed fetch mustn't strand the app offline
+                self.is_online = True
+                self.config_data["is_online"] = True
+            self._publish_snapshot()
+            self._schedule_save()
+        return self.get_bin_path(filename) if server else None
+
+    def download_bin(self, side):
+        """Schedule fetch_bin() on the background loop; returns a concurrent.futures.Future."""
+        return self._run_async(self.fetch_bin(side))
 
     def download_all_files(self):
-        asyncio.run(self.download_all_files_async())
-        self.download_complete.set()
+        """Blocking variant of start(), kept for callers that expect to wait."""
+        self.start().result()
+
+    def _schedule_save(self):
+        """Mark the config dirty; the saver thread coalesces bursts into one write."""
+        self._dirty_event.set()
+
+    def _save_worker(self):
+        while True:
+            self._dirty_event.wait()
+            time.sleep(self.SAVE_DEBOUNCE)
+            self.flush()
+
+    def flush(self):
+        """Write the config to disk now if there are unsaved changes."""
+        with self.config_lock:
+            if self._dirty_event.is_set():
+                self._dirty_event.clear()
+                self.save_config_to_file()
 
     def save_config_to_file(self):
         try:
             config_dir = os.path.dirname(self.LOCAL_CONFIG_PATH)
             os.makedirs(config_dir, exist_ok=True)
-            with open(self.LOCAL_CONFIG_PATH, 'w', encoding="utf-8") as f:
-                json.dump(self.config_data, f, indent=4)
+            blob = json_dumps(self.config_data)
+            # Write a sibling temp file and rename over the target so a crash never leaves a truncated cache
+            tmp_path = self.LOCAL_CONFIG_PATH + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.LOCAL_CONFIG_PATH)
         except Exception:
             pass
 
+    def _publish_snapshot(self):
+        """Swap in a read-only copy of config_data. Caller must hold config_lock."""
+        self._snapshot = MappingProxyType(dict(self.config_data))
+
     def get_config_value(self, key, default=None):
-        with self.config_lock:
-            return self.config_data.get(key, default)
+        return self._snapshot.get(key, default)
 
     def set_config_value(self, key, value):
         with self.config_lock:
             self.config_data[key] = value
-            self.save_config_to_file()
+            self._publish_snapshot()
+            self._schedule_save()
 
     def wait_until_downloaded(self, timeout=30):
         return self.download_complete.wait(timeout)
 
     def is_online_status(self):
-        with self.config_lock:
-            return self.is_online
+        return self.is_online
 
     def get_firmware_info(self, side):
-        filename = self.side_to_filename.get(side)
-        if not filename:
+        info = self._firmware_by_side.get(side)
+        if info is None:
             return None
-        urls = self.bin_file_urls.get(filename, {})
-        with self.config_lock:
-            fw_entry = (self.config_data.get("firmware", {}) or {}).get(side, {}) or {}
-        version = str(fw_entry.get("version", "")).strip()
-        name = fw_entry.get("name")
-        if not name or not str(name).strip():
-            name = filename[:-4] if filename.lower().endswith(".bin") else filename
-        return {
-            "name": name,
-            "filename": filename,
-            "primary_url": urls.get("primary"),
-            "fallback_url": urls.get("fallback"),
-            "version": version,
-            "changelog": fw_entry.get("changelog", []),
-        }
+        result = info._asdict()
+        result["changelog"] = list(info.changelog)
+        return result
+
+    def get_firmware_filename(self, side):
+        info = self._firmware_by_side.get(side)
+        return info.filename if info is not None else None
 
     def get_firmware_urls(self, side):
-        info = self.get_firmware_info(side)
-        if not info:
+        info = self._firmware_by_side.get(side)
+        if info is None:
             return None, None
-        return info["primary_url"], info["fallback_url"]
+        return info.primary_url, info.fallback_url
+
+    def get_bin_path(self, filename):
+        return os.path.join(self._download_dir, filename)
 
     def is_bin_downloaded(self, name):
         filename = f"{name}.bin" if not name.endswith('.bin') else name
-        bin_path = get_download_path(filename)
+        bin_path = self.get_bin_path(filename)
+        self._refresh_index_entry(filename)
         return self._is_valid_file(bin_path) and self.bin_files_downloaded.get(filename, False)
 
     def get_aio_info(self):
@@ -316,9 +735,9 @@ class ConfigManager:
         Return dict with AIO fields: version, name, primary_url, fallback_url, changelog[].
         Falls back to global version if aio.version is missing.
         """
-        with self.config_lock:
-            aio = (self.config_data.get("aio") or {}).copy()
-            global_version = str(self.config_data.get("version", "")).strip()
+        snapshot = self._snapshot
+        aio = (snapshot.get("aio") or {}).copy()
+        global_version = str(snapshot.get("version", "")).strip()
         # Normalize
         aio["version"] = str(aio.get("version", "") or global_version).strip()
         aio["name"] = str(aio.get("name", "")).strip()
@@ -1,10 +1,11 @@
-import requests
 import threading
+import queue
 import os
 import subprocess
 import time
 import sys
-from modules.utils import get_download_path, get_icon_path
+import re
+from modules.utils import get_icon_path
 
 class Flasher:
     """
@@ -14,6 +15,13 @@ class Flasher:
     ``version``, ``changelog``, ``primary_url``, and ``fallback_url`` for
     each side.
     """
+    # All esptool markers in one alternation so each line is scanned once
+    OUTPUT_MARKERS = re.compile(
+        r"Writing at|Hash of data verified\.|Leaving\.\.\. WARNING: ESP32-S3"
+    )
+    # esptool pipes are read in bulk and decoded as latin-1 (the output is ASCII)
+    PIPE_BUFFER_SIZE = 1 << 20
+
     def __init__(self, logger, serial_handler, config_manager):
         self.logger = logger
         self.serial_handler = serial_handler
@@ -27,6 +35,32 @@ class Flasher:
             raise
         self.is_flashing = False
         self.flashing_lock = threading.Lock()  # Ensure only one flashing process runs at a time
+        # One worker runs download/flash jobs in order instead of a new thread per click
+        self._tasks = queue.Queue()
+        self._pending = 0  # Jobs queued or running; counted from enqueue so quit can wait on them
+        self._pending_lock = threading.Lock()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    @property
+    def has_pending_work(self):
+        """True while a flash runs or any download/flash job is still queued."""
+        return self.is_flashing or self._pending > 0
+
+    def _submit(self, task):
+        with self._pending_lock:
+            self._pending += 1
+        self._tasks.put(task)
+
+    def _worker(self):
+        while True:
+            task = self._tasks.get()
+            try:
+                task()
+            except Exception as e:
+                self.logger.terminal_print(f"Flasher task failed: {e}")
+            finally:
+                with self._pending_lock:
+                    self._pending -= 1
 
     def download_and_flash(self, firmware_key):
         """Flash firmware for the specified side or firmware key, downloading if needed."""
@@ -38,7 +72,7 @@ class Flasher:
                 )
                 return
             bin_filename = info["filename"]
-            bin_path = get_download_path(bin_filename)
+            bin_path = self.config_manager.get_bin_path(bin_filename)
             if self.config_manager.is_bin_downloaded(info["name"]):
                 self.logger.terminal_print(f"Using pre-downloaded {bin_filename} at {bin_path}")
                 self.flash_firmware(bin_path)
@@ -50,55 +84,20 @@ class Flasher:
                 )
                 return
 
+            # Same session, connector and mirror hedging as the startup downloads
             try:
-                primary_url, fallback_url = self.config_manager.get_firmware_urls(
-                    firmware_key
-                )
-                primary_server = "GitHub"
-                fallback_server = "Gitee"
-                last_successful_server = self.config_manager.get_config_value("last_successful_server")
-                if last_successful_server == "gitee":
-                    primary_url, fallback_url = fallback_url, primary_url
-                    primary_server, fallback_server = fallback_server, primary_server
-                    self.logger.terminal_print(f"Prioritizing {fallback_server} for {bin_filename}")
-
-                response = requests.get(primary_url, stream=True, timeout=10)
-                response.raise_for_status()
-                with open(bin_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                self.logger.terminal_print(
-                    f"Downloaded {bin_filename} from {primary_server} to {bin_path}"
-                )
-                self.config_manager.set_config_value("last_successful_server", primary_server.lower())
-                self.config_manager.set_config_value("is_online", True)
-                self.flash_firmware(bin_path)
+                downloaded_path = self.config_manager.download_bin(firmware_key).result()
+            except Exception as e:
+                self.logger.terminal_print(f"Failed to download {bin_filename}: {e}")
+                return
+            if not downloaded_path:
+                self.logger.terminal_print(f"Failed to download {bin_filename} from both servers.")
+                return
+            server = self.config_manager.get_config_value("last_successful_server", "")
+            self.logger.terminal_print(f"Downloaded {bin_filename} from {server} to {downloaded_path}")
+            self.flash_firmware(downloaded_path)
 
-            except requests.RequestException as e:
-                self.logger.terminal_print(
-                    f"Failed to download {bin_filename} from {primary_server}: {e}"
-                )
-                try:
-                    response = requests.get(fallback_url, stream=True, timeout=10)
-                    response.raise_for_status()
-                    with open(bin_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    self.logger.terminal_print(
-                        f"Downloaded {bin_filename} from {fallback_server} to {bin_path}"
-                    )
-                    self.config_manager.set_config_value(
-                        "last_successful_server", fallback_server.lower()
-                    )
-                    self.config_manager.set_config_value("is_online", True)
-                    self.flash_firmware(bin_path)
-                except requests.RequestException as e:
-                    self.logger.terminal_print(
-                        f"Failed to download {bin_filename} from {fallback_server}: {e}"
-                    )
-                    self.config_manager.set_config_value("is_online", False)
-
-        threading.Thread(target=task, daemon=True).start()
+        self._submit(task)
 
     def flash_local_bin(self, local_filepath):
         """Flash a local BIN file."""
@@ -110,18 +109,32 @@ class Flasher:
                 self.flash_firmware(local_filepath)
             except Exception as e:
                 self.logger.terminal_print(f"Failed to flash local bin: {e}")
-        threading.Thread(target=task, daemon=True).start()
+        self._submit(task)
 
     def flash_firmware(self, bin_path):
-        """Start the flashing process in a separate thread."""
+        """Queue the flashing process on the worker thread."""
         if not bin_path:
             self.logger.terminal_print("No BIN file specified for flashing.")
             return
-        try:
-            self.logger.terminal_print("Starting flashing...\n")
-            threading.Thread(target=self.flash_firmware_thread, args=(bin_path,), daemon=True).start()
-        except Exception as e:
-            self.logger.terminal_print(f"Error initiating flashing: {e}")
+        self.logger.terminal_print("Starting flashing...\n")
+        self._submit(lambda: self.flash_firmware_thread(bin_path))
+
+    def _pump_output(self, process, handle_line):
+        """Feed every esptool stdout/stderr line to `handle_line` until both pipes close."""
+        # One reader thread per pipe: anonymous pipes can't be waited on with select() on Windows
+        def read_stream(pipe):
+            for raw in iter(pipe.readline, b''):
+                # readline only splits on \n; progress updates may be \r-separated
+                for line in raw.splitlines():
+                    handle_line(line.decode('latin-1'))
+            pipe.close()
+
+        threads = [threading.Thread(target=read_stream, args=(pipe,), daemon=True)
+                   for pipe in (process.stdout, process.stderr)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
 
     def flash_firmware_thread(self, bin_path):
         """Handle the flashing process."""
@@ -159,44 +172,32 @@ class Flasher:
                 if sys.platform.startswith('win'):
                     startupinfo = subprocess.STARTUPINFO()
                     startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                    process = subprocess.Popen(
-                        esptool_args,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        shell=False,
-                        startupinfo=startupinfo
-                    )
+                    startupinfo.wShowWindow = subprocess.SW_HIDE
                 else:
-                    process = subprocess.Popen(
-                        esptool_args,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        shell=False
-                    )
-
-                def read_stream(pipe, stream_name):
+                    startupinfo = None
+                # Binary pipes: output is decoded per line by _pump_output, not by a TextIOWrapper
+                process = subprocess.Popen(
+                    esptool_args,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    bufsize=self.PIPE_BUFFER_SIZE,
+                    shell=False,
+                    startupinfo=startupinfo
+                )
+
+                def handle_line(line):
                     nonlocal success_detected, bootloader_warning_detected
-                    for line in iter(pipe.readline, ''):
-                        if "Writing at" in line:
+                    for marker in self.OUTPUT_MARKERS.findall(line):
+                        if marker == "Writing at":
                             self.logger.terminal_print(line.strip())
-                        if "Hash of data verified." in line:
+                        elif marker == "Hash of data verified.":
                             success_detected = True
-                        if "Leaving... WARNING: ESP32-S3" in line:
+                        else:
                             bootloader_warning_detected = True
-                    pipe.close()
-
-                stdout_thread = threading.Thread(target=read_stream, args=(process.stdout, 'STDOUT'), daemon=True)
-                stderr_thread = threading.Thread(target=read_stream, args=(process.stderr, 'STDERR'), daemon=True)
-                stdout_thread.start()
-                stderr_thread.start()
 
+                self._pump_output(process, handle_line)
                 process.wait()
 
-                stdout_thread.join()
-                stderr_thread.join()
-
                 if process.returncode == 0 or success_detected or bootloader_warning_detected:
                     self.logger.terminal_print("\nFlashing completed successfully.\n\n Please remove the usb cable\n\n Thanks for using MAKCU.")
                 else:
@@ -1,18 +1,24 @@
 # modules/gui.py
 
 import tkinter as tk
+from tkinter import font as tkfont
 import customtkinter as ctk
 from PIL import Image
 from customtkinter import CTkImage
 import threading
-import webbrowser
+import collections
+import functools
+import hashlib
+import io
+import json
 import subprocess
+import shutil
 import os
 import time
 import sys
-from tkinter import filedialog
-from tkinter import font as tkfont
 import queue
+import re
+from types import MappingProxyType
 from .logger import Logger
 from .serial_handler import SerialHandler
 from .flasher import Flasher
@@ -23,7 +29,55 @@ from .usb_name_changer import USBNameChanger, USBNameChangerFTDI
 from tkinter import messagebox
 
 
+def _make_theme(root_bg, button_bg, button_fg, dropdown_selected_bg):
+    return MappingProxyType({
+        "root_bg": root_bg,
+        "button_bg": button_bg,
+        "button_fg": button_fg,
+        "marquee_bg": root_bg,
+        "marquee_fg": button_fg,
+        "dropdown_bg": root_bg,
+        "dropdown_fg": button_fg,
+        "dropdown_selected_bg": dropdown_selected_bg,
+        # Ready-made CTkButton style for this theme
+        "button": MappingProxyType({
+            "fg_color": button_bg,
+            "text_color": button_fg,
+            "border_color": button_fg,
+            "border_width": 1,
+        }),
+    })
+
+
+DARK_THEME = _make_theme("black", "#1f1f1f", "white", "#333333")
+LIGHT_THEME = _make_theme("white", "#d3d3d3", "black", "#a9a9a9")
+
+# FriendlyName with a trailing "(COMxx)" suffix; group 1 is the bare name
+_COM_NAME_RE = re.compile(r"^(.*) \(COM\d+\)$")
+
+
+@functools.lru_cache(maxsize=1)
+def _file_manager():
+    """Absolute path of the platform's file manager launcher, resolved once."""
+    if sys.platform == "win32":
+        return os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "explorer.exe")
+    name = "open" if sys.platform == "darwin" else "xdg-open"
+    return shutil.which(name) or name
+
+
 class GUI:
+    WINDOW_SAVE_DEBOUNCE_MS = 500  # persist the position once the window has stopped moving
+    TEST_MOVE_COMMAND = b"km.move(50,50)\r"  # sent by the Test button in Normal mode
+    RESIZE_DEBOUNCE_MS = 100  # marquee width is recomputed once a resize burst settles
+    ICON_CACHE_VERSION = 2  # Bump when _load_icon's resampling changes so stale .rgba caches are redrawn
+    DEVICE_INFO_TTL = 0.5  # seconds a USB adapter lookup is reused across status updates
+    PROGRESS_LOG_BATCH_MS = 50  # download progress lines landing within this window share one insert
+    # MCU mode -> (label colour, status text); None is the disconnected state
+    MCU_STATUS = {
+        "Normal": ("#0acc1e", "MAKCU Connected in Normal mode on %s"),  # Green
+        "Flash": ("#bf0a37", "MAKCU Connected in Flash mode on %s"),  # Red
+        None: ("#1860db", "MCU disconnected"),
+    }
     def __init__(self, root, is_admin_func):
         self.root = root
         self.is_admin = is_admin_func
@@ -34,22 +88,49 @@ class GUI:
         self.root.title("MAKCU v2.1")
         self.root.resizable(True, True)
         self.root.minsize(800, 600)
+        # One font object per face, shared by every widget instead of a tuple resolved per widget
+        self._font = ctk.CTkFont(family="Helvetica", size=12)
+        self._mono_font = ctk.CTkFont(family="Courier", size=12)
+        # Screen size is read once per session
+        self._screen_w = self.root.winfo_screenwidth()
+        self._screen_h = self.root.winfo_screenheight()
         self.root.overrideredirect(True)
         self.root.wm_attributes("-topmost", True)
-        self.task_queue = queue.Queue()
-        self.process_queue()
+        # Background threads hand UI work to the Tk thread through this queue (see _post)
+        self.task_queue = queue.SimpleQueue()
+        self._tx_queue = queue.SimpleQueue()  # serial writes, drained by _serial_tx_worker
+        self._dialog_open = False  # offline .bin picker is showing
+        self._quit_pending = False  # quit requested, waiting for a flash to finish
+        self._mainloop_running = False
+        self._drain_pending = False
 
         # Internal state
         self.is_connected = False
         self.current_mode = "Normal"
         self.theme_is_dark = True
-        self.command_history = []
+        self.command_history = collections.deque(maxlen=20)  # oldest falls off on append
+        self._history_appended = 0  # total commands ever appended; the deque length saturates at 20
+        self._history_listed = 0  # value of _history_appended the open dropdown reflects
+        self.history_dropdown = None  # Toplevel created by show_history_menu
+        self.history_listbox = None
         self.history_position = -1
         self.available_ports = []
         self.port_mapping = {}
         self.is_devkit_mode = False
         self.is_online = False
         self.is_offline = True
+        self._save_pos_after_id = None
+        self._resize_after_id = None
+        self._drag_pending = False
+        # Window geometry lives in its own file so moving the window never rewrites config.json
+        self._geom_path = os.path.join(get_main_folder(), 'window.json')
+        self._saved_position = None
+        self._device_info_cache = None
+        self._last_status_key = None
+        self._themed_buttons = []  # every button restyled on theme change, lazy ones join when built
+        self._applied_theme = None
+        self._pending_log = []
+        self._log_flush_id = None
 
         # Configure grid weights for the main window
         self.root.grid_rowconfigure(0, weight=0)  # Marquee row
@@ -83,8 +164,8 @@ class GUI:
         self.ch343_changer = USBNameChanger(self.logger, self.is_admin)
         self.ftdi_changer  = USBNameChangerFTDI(self.logger, self.is_admin)
 
-        # Schedule driver install only once (CH343 requires it)
-        self.root.after(500, self.ch343_changer.ensure_driver_installed)
+        # Driver install only once (CH343 requires it); pnputil runs off the Tk thread
+        threading.Thread(target=self.ch343_changer.ensure_driver_installed, name="driver-install", daemon=True).start()
 
         # Still only need one mismatch check (applies to CH340-named devices)
         self.root.after(1500, self._check_ch340_mismatch)
@@ -97,8 +178,6 @@ class GUI:
         self.create_marquee_label()       # Row 0
         self.create_mcu_status_label()    # Row 1
         self.create_buttons()             # Row 2
-        self.create_flash_buttons()       # Integrated into row 2
-        self.update_flash_buttons_text()  # Initialize flash buttons' text
         self.create_icons()               # Row 3
         self.create_text_input()          # Row 4
 
@@ -119,64 +198,111 @@ class GUI:
 
         # Start serial monitoring
         self.serial_handler.start_monitoring()
+        threading.Thread(target=self._serial_tx_worker, name="serial-tx", daemon=True).start()
 
-        # Schedule marquee initialization after update check
-        def check_update_and_init_marquee():
-            if self.updater.update_check_complete.is_set():
-                # Set online/offline status after update check
-                self.is_offline = self.updater.is_offline
-                if self.is_offline:
-                    self.online_offline_button.configure(text="Offline")
-                else:
-                    self.online_offline_button.configure(text="Online")
-                self.fetch_and_display_welcome_message()
-            else:
-                self.root.after(100, check_update_and_init_marquee)
-
-        self.root.after(100, check_update_and_init_marquee)
+        # Initialize the marquee once the update check signals completion
+        threading.Thread(target=self._await_update_check, daemon=True).start()
 
         # Bind the window resize event to adjust the marquee
         self.root.bind("<Configure>", self.on_window_resize)
-        
+
+        # First drain runs once mainloop starts and picks up anything queued during startup
+        self.root.after(0, self.process_queue)
+
+    def _await_update_check(self):
+        """Background thread: block on the updater's event, then finish startup on the Tk thread."""
+        self.updater.update_check_complete.wait()
+        self._post(self._init_marquee_after_update)
+
+    def _init_marquee_after_update(self):
+        # Set online/offline status after update check
+        self.is_offline = self.updater.is_offline
+        if self.is_offline:
+            self.online_offline_button.configure(text="Offline")
+        else:
+            self.online_offline_button.configure(text="Online")
+        self.fetch_and_display_welcome_message()
+
+    def _post(self, task):
+        """
+        Run `task` on the Tk thread. Safe from any thread; wakes the event loop
+        immediately instead of waiting for a polling tick.
+        """
+        self.task_queue.put(task)
+        # Before mainloop, Tk calls from other threads fail; the startup drain covers those
+        if self._mainloop_running and not self._drain_pending:
+            self._drain_pending = True
+            self.root.after(0, self.process_queue)
+
+    def _serial_tx_worker(self):
+        """
+        Background thread: write queued commands to the serial port so a full
+        driver buffer never stalls the Tk loop. Pending commands go out in one write.
+        """
+        while True:
+            chunks = [self._tx_queue.get()]
+            try:
+                while True:
+                    chunks.append(self._tx_queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                connection = self.serial_handler.serial_connection
+                if connection is None or not connection.is_open:
+                    raise IOError("serial connection is not open")
+                connection.write(b"".join(chunks))
+            except Exception as e:
+                self.logger.terminal_print(f"Failed to send command: {e}")
+
     def process_queue(self):
-        """Check the queue for tasks and execute them in the main thread."""
-        try:
-            while True:
-                task = self.task_queue.get_nowait()  # Get a task if available
-                task()  # Run the task (e.g., update_gui)
-        except queue.Empty:
-            pass  # No tasks left in the queue
-        # Schedule the next check in 100ms
-        self.root.after(100, self.process_queue)
-        
-    
+        """Execute queued tasks in the main thread."""
+        self._mainloop_running = True
+        self._drain_pending = False
+        # Only what is queued now; tasks posted meanwhile schedule their own drain
+        for _ in range(self.task_queue.qsize()):
+            task = self.task_queue.get_nowait()
+            task()  # Run the task (e.g., update_gui)
+
     def update_progress(self, filename, status):
         def update_gui():
             if filename == "all" and status == "starting":
-                self.logger.terminal_print("Downloading files...")
+                self._queue_progress_log("Downloading files...")
             elif filename == "all" and status == "complete":
-                self.logger.terminal_print("Download complete")
+                self._queue_progress_log("Download complete")
+                self._flush_progress_log()
                 self.fetch_and_display_welcome_message()
             else:
-                self.logger.terminal_print(f"Download {filename}: {status}")
+                self._queue_progress_log(f"Download {filename}: {status}")
 
         # Send the task to the main thread via the queue
-        
-        self.task_queue.put(update_gui)
-        
+        self._post(update_gui)
+
+    def _queue_progress_log(self, message):
+        """Buffer a progress line; everything within PROGRESS_LOG_BATCH_MS goes out as one insert."""
+        self._pending_log.append(message)
+        if self._log_flush_id is None:
+            self._log_flush_id = self.root.after(self.PROGRESS_LOG_BATCH_MS, self._flush_progress_log)
+
+    def _flush_progress_log(self):
+        if self._log_flush_id is not None:
+            self.root.after_cancel(self._log_flush_id)
+            self._log_flush_id = None
+        if self._pending_log:
+            self.logger.terminal_print("\n".join(self._pending_log))
+            self._pending_log = []
+
     def restore_window_position(self):
         """
-        Restore the window position from the config.json file.
+        Restore the window position from window.json (or config.json from older builds).
         """
-        window_position = self.config_manager.get_config_value("window_position", None)
+        window_position = self._read_window_position()
+        self._saved_position = window_position
         if window_position and isinstance(window_position, dict):
             x = window_position.get("x", 100)
             y = window_position.get("y", 100)
             # Ensure the position is within the screen bounds
-            screen_width = self.root.winfo_screenwidth()
-            screen_height = self.root.winfo_screenheight()
-            x = max(0, min(x, screen_width - 800))
-            y = max(0, min(y, screen_height - 600))
+            x = max(0, min(x, self._screen_w - 800))
+            y = max(0, min(y, self._screen_h - 600))
             self.root.geometry(f"800x600+{x}+{y}")
             #self.logger.terminal_print(f"Restored window position to x={x}, y={y}")
         else:
@@ -186,21 +312,55 @@ class GUI:
             
     def save_window_position(self):
         """
-        Save the current window position to config.json.
+        Save the current window position to window.json.
         """
+        if self._save_pos_after_id:
+            self.root.after_cancel(self._save_pos_after_id)
+            self._save_pos_after_id = None
         try:
-            x = self.root.winfo_x()
-            y = self.root.winfo_y()
-            self.config_manager.set_config_value("window_position", {"x": x, "y": y})
+            x, y = self._store_window_position()
             self.logger.terminal_print(f"Saved window position: x={x}, y={y}")
         except Exception as e:
             self.logger.terminal_print(f"Failed to save window position: {e}")
+
+    def _read_window_position(self):
+        try:
+            with open(self._geom_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Older builds kept the position inside config.json
+            return self.config_manager.get_config_value("window_position", None)
+
+    def _store_window_position(self):
+        """Write the position to its own small file (tmp + rename) when it has changed."""
+        position = {"x": self.root.winfo_x(), "y": self.root.winfo_y()}
+        if position != self._saved_position:
+            tmp_path = self._geom_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(position, f)
+            os.replace(tmp_path, self._geom_path)
+            self._saved_position = position
+        return position["x"], position["y"]
+
+    def _schedule_window_position_save(self):
+        """Coalesce a burst of move/resize events into one save after they stop."""
+        if self._save_pos_after_id:
+            self.root.after_cancel(self._save_pos_after_id)
+        self._save_pos_after_id = self.root.after(self.WINDOW_SAVE_DEBOUNCE_MS, self._flush_window_position)
+
+    def _flush_window_position(self):
+        self._save_pos_after_id = None
+        try:
+            self._store_window_position()
+        except Exception as e:
+            self.logger.terminal_print(f"Failed to save window position: {e}")
         
     # -------------------------------------------------------------
     # Output terminal
     # -------------------------------------------------------------
     def create_output_box(self):
-        output_text = ctk.CTkTextbox(self.root, state="disabled", font=("Helvetica", 12))
+        # Terminal output is append-only, so no undo stack has to track every insert/trim
+        output_text = ctk.CTkTextbox(self.root, state="disabled", font=self._font, undo=False)
         output_text.grid(row=5, column=0, columnspan=3, padx=5, pady=(0, 5), sticky="nsew")
         return output_text
 
@@ -215,9 +375,9 @@ class GUI:
         self.marquee_label = ctk.CTkLabel(
             self.root,
             text="",
-            text_color="white",
-            bg_color="black",
-            font=("Courier", 12),
+            text_color=self._theme()["marquee_fg"],
+            bg_color=self._theme()["marquee_bg"],
+            font=self._mono_font,
             anchor="center"  # Center text for balanced appearance
         )
         self.marquee_label.grid(row=0, column=0, columnspan=3, padx=0, pady=0, sticky="ew")
@@ -225,9 +385,15 @@ class GUI:
         # Initialize marquee variables
         self.marquee_text = ""
         self.full_message = ""
+        self._marquee_buf = ""
+        self._marquee_period = 1
+        self._last_marquee_text = None
+        self._last_marquee_ts = 0.0
         self.marquee_position = 0
         self.display_length = 20
         self.marquee_speed = 50
+        self._marquee_font_spec = None
+        self._marquee_char_w = 0
 
     # -------------------------------------------------------------
     # MCU Status Label at row=1
@@ -240,7 +406,7 @@ class GUI:
             self.root,
             text="MCU disconnected",
             text_color="blue",
-            font=("Helvetica", 12),
+            font=self._font,
             anchor="w"
         )
         self.label_mcu.grid(row=1, column=1, padx=10, pady=5, sticky="w")
@@ -252,8 +418,7 @@ class GUI:
         """
         Create the left and right button frames in row 2.
         """
-        button_bg = "#1f1f1f" if self.theme_is_dark else "#d3d3d3"
-        button_fg = "white" if self.theme_is_dark else "black"
+        style = self._theme()["button"]
 
         # Left button frame
         self.left_button_frame = ctk.CTkFrame(self.root, fg_color="transparent")
@@ -267,11 +432,8 @@ class GUI:
             self.left_button_frame,
             text=initial_theme_text,
             command=self.change_theme,
-            fg_color=button_bg,
-            text_color=button_fg,
-            border_color=button_fg,
-            border_width=1,
-            font=("Helvetica", 12)
+            **style,
+            font=self._font
         )
         self.theme_button.grid(row=0, column=0, padx=0, pady=5, sticky="w")
 
@@ -279,11 +441,8 @@ class GUI:
             self.left_button_frame,
             text="User Logs",
             command=self.open_log,
-            fg_color=button_bg,
-            text_color=button_fg,
-            border_color=button_fg,
-            border_width=1,
-            font=("Helvetica", 12)
+            **style,
+            font=self._font
         )
         self.open_log_button.grid(row=1, column=0, padx=0, pady=5, sticky="w")
 
@@ -291,26 +450,12 @@ class GUI:
             self.left_button_frame,
             text="Clear Log",
             command=self.clear_terminal,
-            fg_color=button_bg,
-            text_color=button_fg,
-            border_color=button_fg,
-            border_width=1,
-            font=("Helvetica", 12)
+            **style,
+            font=self._font
         )
         self.clear_log_button.grid(row=2, column=0, padx=0, pady=5, sticky="w")
 
-        # New USB Name Toggle Button (replacing hidden placeholder)
-        self.usb_name_toggle_button = ctk.CTkButton(
-            self.left_button_frame,
-            text="Toggle CH340/CH343",
-            command=self.toggle_usb_name,
-            fg_color=button_bg,
-            text_color=button_fg,
-            border_color=button_fg,
-            border_width=1,
-            font=("Helvetica", 12)
-        )
-        self.usb_name_toggle_button.grid(row=3, column=0, padx=0, pady=5, sticky="w")
+        # USB name toggle (row 3) and flash buttons (row 4) are built on first reveal
 
         # Right button frame
         self.right_button_frame = ctk.CTkFrame(self.root, fg_color="transparent")
@@ -323,11 +468,8 @@ class GUI:
             self.right_button_frame,
             text="Online",
             command=self.toggle_online_offline,
-            fg_color=button_bg,
-            text_color=button_fg,
-            border_color=button_fg,
-            border_width=1,
-            font=("Helvetica", 12)
+            **style,
+            font=self._font
         )
         self.online_offline_button.grid(row=0, column=0, padx=0, pady=5, sticky="e")
 
@@ -335,11 +477,8 @@ class GUI:
             self.right_button_frame,
             text="MAKCU",
             command=self.toggle_makcu_mode,
-            fg_color=button_bg,
-            text_color=button_fg,
-            border_color=button_fg,
-            border_width=1,
-            font=("Helvetica", 12)
+            **style,
+            font=self._font
         )
         self.makcu_button.grid(row=1, column=0, padx=0, pady=5, sticky="e")
         
@@ -347,11 +486,8 @@ class GUI:
             self.right_button_frame,
             text="Test",
             command=self.test_button_function,
-            fg_color=button_bg,
-            text_color=button_fg,
-            border_color=button_fg,
-            border_width=1,
-            font=("Helvetica", 12)
+            **style,
+            font=self._font
         )
         self.control_button.grid(row=2, column=0, padx=0, pady=5, sticky="e")
 
@@ -359,99 +495,163 @@ class GUI:
             self.right_button_frame,
             text="Quit",
             command=self.quit_application,
-            fg_color=button_bg,
-            text_color=button_fg,
-            border_color=button_fg,
-            border_width=1,
-            font=("Helvetica", 12)
+            **style,
+            font=self._font
         )
         self.quit_button.grid(row=3, column=0, padx=0, pady=5, sticky="e")
 
-    def create_flash_buttons(self):
-        """
-        Create the flash buttons in row 2, within button frames.
-        """
-        button_bg = "#1f1f1f" if self.theme_is_dark else "#d3d3d3"
-        button_fg = "white" if self.theme_is_dark else "black"
+        self._themed_buttons.extend([
+            self.theme_button,
+            self.quit_button,
+            self.control_button,
+            self.open_log_button,
+            self.clear_log_button,
+            self.makcu_button,
+            self.online_offline_button,
+        ])
+
+    # Rarely used buttons: constructed the first time they are shown
+    def _make_button(self, frame, text, command):
+        style = self._theme()["button"]
+        button = ctk.CTkButton(
+            frame,
+            text=text,
+            command=command,
+            **style,
+            font=self._font
+        )
+        self._themed_buttons.append(button)
+        return button
+
+    @functools.cached_property
+    def usb_name_toggle_button(self):
+        button = self._make_button(self.left_button_frame, "Toggle CH340/CH343", self.toggle_usb_name)
+        button.grid(row=3, column=0, padx=0, pady=5, sticky="w")
+        return button
 
+    @functools.cached_property
+    def left_flash_button(self):
         # Left flash button in left button frame (row 4)
-        self.left_flash_button = ctk.CTkButton(
-            self.left_button_frame,
-            text="Flash Left",
-            command=lambda: self.handle_flash('left'),
-            fg_color=button_bg,
-            text_color=button_fg,
-            border_color=button_fg,
-            border_width=1,
-            font=("Helvetica", 12)
-        )
-        self.left_flash_button.grid(row=4, column=0, padx=0, pady=5, sticky="w")
-        self.left_flash_button.grid_remove()
+        button = self._make_button(self.left_button_frame, self._flash_button_text('left'),
+                                   functools.partial(self.handle_flash, 'left'))
+        button.grid(row=4, column=0, padx=0, pady=5, sticky="w")
+        return button
 
+    @functools.cached_property
+    def right_flash_button(self):
         # Right flash button in right button frame (row 4)
-        self.right_flash_button = ctk.CTkButton(
-            self.right_button_frame,
-            text="Flash Right",
-            command=lambda: self.handle_flash('right'),
-            fg_color=button_bg,
-            text_color=button_fg,
-            border_color=button_fg,
-            border_width=1,
-            font=("Helvetica", 12)
-        )
-        self.right_flash_button.grid(row=4, column=0, padx=0, pady=5, sticky="e")
-        self.right_flash_button.grid_remove()
+        button = self._make_button(self.right_button_frame, self._flash_button_text('right'),
+                                   functools.partial(self.handle_flash, 'right'))
+        button.grid(row=4, column=0, padx=0, pady=5, sticky="e")
+        return button
+
+    def _built(self, name):
+        """The lazily created widget `name`, or None if it hasn't been shown yet."""
+        return self.__dict__.get(name)
+
+    def _flash_button_text(self, side):
+        if self.is_devkit_mode:
+            return "Flash Top Right" if side == 'left' else "Flash Bottom Right"
+        return "USB1 Flash" if side == 'left' else "USB3 Flash"
 
     def update_flash_buttons_text(self):
         """
         Update the flash buttons' text based on Devkit mode.
         """
-        if self.is_devkit_mode:
-            self.left_flash_button.configure(text="Flash Top Right")
-            self.right_flash_button.configure(text="Flash Bottom Right")
-        else:
-            self.left_flash_button.configure(text="USB1 Flash")
-            self.right_flash_button.configure(text="USB3 Flash")
+        for side in ('left', 'right'):
+            button = self._built(f"{side}_flash_button")
+            if button is not None:
+                button.configure(text=self._flash_button_text(side))
 
     def create_icons(self):
         """
         Create Discord and GitHub icons in row 3.
         """
         icon_size = (20, 20)
-        discord_icon_path = get_icon_path("Discord.png")
-        github_icon_path = get_icon_path("GitHub.png")
-
-        if not os.path.exists(discord_icon_path):
-            self.logger.terminal_print(f"Discord icon not found at {discord_icon_path}")
-        if not os.path.exists(github_icon_path):
-            self.logger.terminal_print(f"GitHub icon not found at {github_icon_path}")
-
-        try:
-            discord_pil_image = Image.open(discord_icon_path).resize(icon_size)
-            github_pil_image = Image.open(github_icon_path).resize(icon_size)
-        except Exception as e:
-            self.logger.terminal_print(f"Error loading icons: {e}")
-            discord_pil_image = Image.new('RGBA', icon_size, (255, 255, 255, 0))
-            github_pil_image = Image.new('RGBA', icon_size, (255, 255, 255, 0))
-
-        self.discord_icon = CTkImage(discord_pil_image, size=icon_size)
-        self.github_icon = CTkImage(github_pil_image, size=icon_size)
+        # Transparent placeholders until _load_icons_bg swaps the real images in
+        placeholder = Image.new('RGBA', icon_size, (255, 255, 255, 0))
+        self.discord_icon = CTkImage(placeholder, size=icon_size)
+        self.github_icon = CTkImage(placeholder, size=icon_size)
 
         self.github_icon_label = ctk.CTkLabel(self.root, image=self.github_icon, text="")
         self.github_icon_label.grid(row=4, column=0, padx=(70, 0), pady=5, sticky="w")
-        self.github_icon_label.bind("<Button-1>", lambda event: webbrowser.open("https://github.com/terrafirma2021/MAKCM"))
-        self.github_icon_label.bind("<Enter>", lambda event: self.github_icon_label.configure(cursor="hand2"))
-        self.github_icon_label.bind("<Leave>", lambda event: self.github_icon_label.configure(cursor=""))
+        self.github_icon_label.bind("<Button-1>", functools.partial(self._open_link, "https://github.com/terrafirma2021/MAKCM"))
+        self.github_icon_label.bind("<Enter>", functools.partial(self._set_cursor, self.github_icon_label, "hand2"))
+        self.github_icon_label.bind("<Leave>", functools.partial(self._set_cursor, self.github_icon_label, ""))
 
         self.discord_icon_label = ctk.CTkLabel(self.root, image=self.discord_icon, text="")
         self.discord_icon_label.grid(row=4, column=2, padx=(0, 70), pady=5, sticky="e")
-        self.discord_icon_label.bind("<Button-1>", lambda event: webbrowser.open("https://discord.gg/6TJBVtdZbq"))
-        self.discord_icon_label.bind("<Enter>", lambda event: self.discord_icon_label.configure(cursor="hand2"))
-        self.discord_icon_label.bind("<Leave>", lambda event: self.discord_icon_label.configure(cursor=""))
+        self.discord_icon_label.bind("<Button-1>", functools.partial(self._open_link, "https://discord.gg/6TJBVtdZbq"))
+        self.discord_icon_label.bind("<Enter>", functools.partial(self._set_cursor, self.discord_icon_label, "hand2"))
+        self.discord_icon_label.bind("<Leave>", functools.partial(self._set_cursor, self.discord_icon_label, ""))
 
         self.discord_icon_label.image = self.discord_icon
         self.github_icon_label.image = self.github_icon
 
+        threading.Thread(target=self._load_icons_bg, args=(icon_size,), daemon=True).start()
+
+    @staticmethod
+    def _open_link(url, event=None):
+        import webbrowser  # only needed once someone clicks an icon
+        webbrowser.open(url)
+
+    @staticmethod
+    def _set_cursor(widget, cursor, event=None):
+        widget.configure(cursor=cursor)
+
+    def _load_icons_bg(self, icon_size):
+        """Background thread: decode the icons, then hand them to the Tk thread."""
+        images = {}
+        for key, filename in (("discord", "Discord.png"), ("github", "GitHub.png")):
+            try:
+                images[key] = self._load_icon(get_icon_path(filename), icon_size)
+            except Exception as e:
+                self.logger.terminal_print(f"Error loading icons: {e}")
+
+        def apply_icons():
+            for key, pil_image in images.items():
+                icon = CTkImage(pil_image, size=icon_size)
+                label = getattr(self, f"{key}_icon_label")
+                label.configure(image=icon)
+                label.image = icon
+                setattr(self, f"{key}_icon", icon)
+
+        self._post(apply_icons)
+
+    def _load_icon(self, src_path, size):
+        """
+        Open `src_path` resized to `size` as RGBA. The resized pixels are cached
+        next to the app, keyed by the resampling version and a digest of the PNG
+        bytes (PyInstaller re-extracts assets each launch, so their mtime can't
+        be trusted).
+        """
+        with open(src_path, 'rb') as f:
+            png = f.read()
+        # Header: resampling version byte + digest of the source PNG
+        header = bytes((self.ICON_CACHE_VERSION,)) + hashlib.blake2b(png, digest_size=16).digest()
+        name = os.path.splitext(os.path.basename(src_path))[0]
+        cache_path = os.path.join(get_main_folder(), f".{name}.{size[0]}x{size[1]}.rgba")
+        try:
+            with open(cache_path, 'rb') as f:
+                cached = f.read()
+            if cached[:len(header)] == header and len(cached) == len(header) + size[0] * size[1] * 4:
+                return Image.frombytes("RGBA", size, cached[len(header):])
+        except OSError:
+            pass
+
+        image = Image.open(io.BytesIO(png)).convert("RGBA")
+        # Box-reduce big sources to within 2x of the target, then a cheap bilinear finish
+        factor = min(image.size[0] // (2 * size[0]), image.size[1] // (2 * size[1]))
+        if factor > 1:
+            image = image.reduce(factor)
+        image = image.resize(size, Image.Resampling.BILINEAR)
+        try:
+            with open(cache_path, 'wb') as f:
+                f.write(header + image.tobytes())
+        except OSError:
+            pass
+        return image
+
     def create_text_input(self):
         input_frame = ctk.CTkFrame(self.root, fg_color="transparent")
         input_frame.grid(row=4, column=0, columnspan=3, padx=5, pady=(5, 0), sticky="ew")
@@ -459,84 +659,42 @@ class GUI:
     
         self.text_input = ctk.CTkEntry(
             input_frame,
-            font=("Helvetica", 12),
+            font=self._font,
             placeholder_text="Press up arrow to view input history",
             placeholder_text_color="gray"
         )
         self.text_input.grid(row=0, column=0, padx=(0, 5), pady=0, sticky="ew")
 
-        self.text_input.bind("<FocusIn>", self.clear_placeholder)
-        self.text_input.bind("<FocusOut>", self.add_placeholder)
         self.text_input.bind("<Return>", self.send_input)
         self.text_input.bind("<KP_Enter>", self.send_input)
         self.text_input.bind("<Up>", self.handle_history)
         self.text_input.bind("<Down>", self.handle_history)
 
-    def clear_placeholder(self, event=None):
-        """
-        Clear the placeholder text when the input field gains focus.
-        """
-        if self.text_input.get() == "Press up arrow to view input history":
-            self.text_input.delete(0, ctk.END)
-            self.text_input.configure(text_color="black")
-
-    def add_placeholder(self, event=None):
-        """
-        Add the placeholder text back if the input field is empty when it loses focus.
-        """
-        if not self.text_input.get():
-            self.text_input.insert(0, "Press up arrow to view input history")
-            self.text_input.configure(text_color="gray")
-
     def define_theme_colors(self):
         """
         Define and apply theme colors based on the current theme setting.
         """
-        if self.theme_is_dark:
-            root_bg = "black"
-            button_bg = "#1f1f1f"
-            button_fg = "white"
-            marquee_bg = "black"
-            marquee_fg = "white"
-            dropdown_bg = "black"
-            dropdown_fg = "white"
-            dropdown_selected_bg = "#333333"
-        else:
-            root_bg = "white"
-            button_bg = "#d3d3d3"
-            button_fg = "black"
-            marquee_bg = "white"
-            marquee_fg = "black"
-            dropdown_bg = "white"
-            dropdown_fg = "black"
-            dropdown_selected_bg = "#a9a9a9"
-
-        self.root.configure(bg=root_bg)
+        theme = self._theme()
+        # Widgets built after the last apply already got the current palette
+        if theme is self._applied_theme:
+            return
+        self._applied_theme = theme
+
+        self.root.configure(bg=theme["root_bg"])
         if hasattr(self, 'marquee_label'):
-            self.marquee_label.configure(bg_color=marquee_bg, text_color=marquee_fg)
-
-        self.dropdown_bg = dropdown_bg
-        self.dropdown_fg = dropdown_fg
-        self.dropdown_selected_bg = dropdown_selected_bg
-
-        buttons = [
-            getattr(self, 'theme_button', None),
-            getattr(self, 'quit_button', None),
-            getattr(self, 'control_button', None),
-            getattr(self, 'open_log_button', None),
-            getattr(self, 'clear_log_button', None),
-            getattr(self, 'makcu_button', None),
-            getattr(self, 'online_offline_button', None),
-            getattr(self, 'left_flash_button', None),
-            getattr(self, 'right_flash_button', None),
-            getattr(self, 'usb_name_toggle_button', None),  # Added USB toggle button
-        ]
-
-        for btn in buttons:
-            if btn:
-                btn.configure(fg_color=button_bg, text_color=button_fg, border_color=button_fg, border_width=1)
-
-        self.output_text.configure(fg_color=root_bg, text_color=button_fg)
+            self.marquee_label.configure(bg_color=theme["marquee_bg"], text_color=theme["marquee_fg"])
+
+        self.dropdown_bg = theme["dropdown_bg"]
+        self.dropdown_fg = theme["dropdown_fg"]
+        self.dropdown_selected_bg = theme["dropdown_selected_bg"]
+
+        for btn in self._themed_buttons:
+            btn.configure(**theme["button"])
+
+        self.output_text.configure(fg_color=theme["root_bg"], text_color=theme["button_fg"])
+
+    def _theme(self):
+        return DARK_THEME if self.theme_is_dark else LIGHT_THEME
 
     def change_theme(self):
         """
@@ -559,43 +717,44 @@ class GUI:
         """
         def update_status():
             if self.serial_handler.is_connected:
-                changer = self._active_changer()  # ← Selects CH343 or FTDI
+                port = self.serial_handler.com_port
+                self.clear_log_button.grid()
+                self.makcu_button.grid()
                 if self.serial_handler.current_mode == "Normal":
-                    status_color = "#0acc1e"  # Green
-                    mode_text = "Normal"
-                    self.clear_log_button.grid()
-                    self.makcu_button.grid()
+                    mode = "Normal"
                     self.usb_name_toggle_button.grid()  # Show in Normal mode
 
-                    device_name, com_port = changer.get_device_info()
+                    _, device_name, com_port = self._device_info()  # CH343 or FTDI
                     if device_name:
-                        mcu_status = f"MAKCU Connected in {mode_text} mode on {com_port} {device_name}"
-                    else:
-                        mcu_status = f"MAKCU Connected in {mode_text} mode on {self.serial_handler.com_port}"
-
+                        port = f"{com_port} {device_name}"
                 else:
-                    status_color = "#bf0a37"  # Red
-                    mode_text = "Flash"
-                    self.clear_log_button.grid()
-                    self.makcu_button.grid()
-                    self.usb_name_toggle_button.grid_remove()
-
-                    mcu_status = f"MAKCU Connected in {mode_text} mode on {self.serial_handler.com_port}"
+                    mode = "Flash"
+                    self._hide_if_built('usb_name_toggle_button')
 
                 if self.serial_handler.current_mode == "Flash" or self.is_devkit_mode:
                     self.show_flash_buttons()
                 else:
                     self.hide_flash_buttons()
+                status_color, template = self.MCU_STATUS[mode]
+                mcu_status = template % port
             else:
-                mcu_status = "MCU disconnected"
-                status_color = "#1860db"
+                status_color, mcu_status = self.MCU_STATUS[None]
                 self.clear_log_button.grid_remove()
                 self.makcu_button.grid_remove()
-                self.usb_name_toggle_button.grid_remove()
+                self._hide_if_built('usb_name_toggle_button')
                 self.hide_flash_buttons()
 
             self.label_mcu.configure(text=mcu_status, text_color=status_color)
 
+        # Serial polling reports the same state repeatedly; only schedule a redraw when it changes
+        handler = self.serial_handler
+        if handler.is_connected:
+            status_key = (True, handler.current_mode, handler.com_port)
+        else:
+            status_key = (False,)
+        if status_key == self._last_status_key:
+            return
+        self._last_status_key = status_key
         self.root.after(0, update_status)
 
 
@@ -607,16 +766,16 @@ class GUI:
             self.logger.terminal_print("Driver installation complete.")
         else:
             self.logger.terminal_print("Driver installation failed.")
-        self.task_queue.put(self.update_mcu_status)  # UI update safely
+        self._post(self.update_mcu_status)  # UI update safely
         
     def _check_ch340_mismatch(self):
-        changer = self._active_changer()  # ← Selects CH343 or FTDI
-        device_name, com_port = changer.get_device_info()
+        changer, device_name, com_port = self._device_info()  # ← Selects CH343 or FTDI
         if device_name and com_port and device_name.startswith(changer.target_desc):
             expected = f"{changer.target_desc} ({com_port})"
             if device_name != expected:
                 self.logger.terminal_print(f"Auto-fixing CH340 name mismatch: {device_name} → {expected}")
                 changer.update_registry_name(expected, com_port)
+                self._invalidate_device_info()
     
 
 
@@ -629,7 +788,8 @@ class GUI:
             self.logger.terminal_print(f"USB name changed to {new_name}")
         else:
             self.logger.terminal_print("Failed to change USB name.")
-        self.task_queue.put(self.update_mcu_status)
+        self._invalidate_device_info()
+        self._post(self.update_mcu_status)
 
     def _restore_original_name_thread(self):
         """
@@ -640,7 +800,8 @@ class GUI:
             self.logger.terminal_print("\nChanging USB name, please wait...\nUSB name restored to USB-Enhanced-SERIAL CH343")
         else:
             self.logger.terminal_print("Failed to restore original USB name.")
-        self.task_queue.put(self.update_mcu_status)
+        self._invalidate_device_info()
+        self._post(self.update_mcu_status)
 
     def _active_changer(self):
         """Return whichever USBNameChanger currently has a matching VID/PID on the bus."""
@@ -649,22 +810,38 @@ class GUI:
                 return ch
         return self.ch343_changer   # fallback so code paths don’t break
 
+    def _device_info(self):
+        """
+        (changer, device_name, com_port) for the attached adapter. Port
+        enumeration is slow, so one result is reused for DEVICE_INFO_TTL seconds.
+        """
+        now = time.monotonic()
+        cached = self._device_info_cache
+        if cached and now - cached[0] < self.DEVICE_INFO_TTL:
+            return cached[1]
+        changer = self._active_changer()
+        info = (changer, *changer.get_device_info())
+        self._device_info_cache = (now, info)
+        return info
+
+    def _invalidate_device_info(self):
+        self._device_info_cache = None
+        # The device name is part of the status line; force the next status update through
+        self._last_status_key = None
+
 
     def toggle_usb_name(self, auto_install_driver: bool = False):
         """
         Toggle between the adapter's factory name (CH343 or FTDI)
         and the CH340-style custom name.
         """
-        import re
-
-        changer = self._active_changer()          # ← helper added earlier
-        device_name, com_port = changer.get_device_info()
+        changer, device_name, com_port = self._device_info()
         if device_name is None:
             self.logger.terminal_print("Device not found. Please insert the device.")
             return
 
         # Strip the "(COMxx)" suffix if present
-        match     = re.match(r"^(.*) \(COM\d+\)$", device_name)
+        match     = _COM_NAME_RE.match(device_name)
         base_name = match.group(1) if match else device_name
 
         want_custom  = base_name == changer.default_name      # switch to CH340 style
@@ -716,6 +893,9 @@ class GUI:
                 self.logger.terminal_print(f"Fixing FriendlyName mismatch: {device_name} → {expected}")
                 changer.update_registry_name(expected, com_port)
 
+        # The name is about to change; don't let a status refresh reuse the old one
+        self._invalidate_device_info()
+
         # ───────────────────────────────────── perform the toggle ──────────────────────────────────
         if want_custom:
             threading.Thread(
@@ -755,17 +935,13 @@ class GUI:
             if not self.serial_handler.is_connected or not self.serial_handler.serial_open:
                 self.logger.terminal_print("Connect to Device first")
             else:
-                command += "\r"
                 self.text_input.delete(0, ctk.END)
-                try:
-                    self.serial_handler.serial_connection.write(command.encode())
-                    self.logger.terminal_print(f"Sent command: {command.strip()}")
-                    if len(self.command_history) >= 20:
-                        self.command_history.pop(0)
-                    self.command_history.append(command.strip())
-                    self.history_position = -1
-                except Exception as e:
-                    self.logger.terminal_print(f"Failed to send command: {e}")
+                self._tx_queue.put(command.encode() + b"\r")
+                self.logger.terminal_print(f"Sent command: {command}")
+                self.command_history.append(command)
+                self._history_appended += 1
+                self.history_position = -1
+                self.update_history_dropdown()
         return "break"
 
     def clear_terminal(self):
@@ -790,11 +966,19 @@ class GUI:
         if os.path.exists(file_path):
             try:
                 if sys.platform == "win32":
-                    subprocess.Popen(['explorer', '/select,', file_path])
+                    args = [_file_manager(), '/select,', file_path]
                 elif sys.platform == "darwin":
-                    subprocess.Popen(['open', '-R', file_path])
+                    args = [_file_manager(), '-R', file_path]
                 else:
-                    subprocess.Popen(['xdg-open', os.path.dirname(file_path)])
+                    args = [_file_manager(), os.path.dirname(file_path)]
+                # Detached from our stdio so the child can't inherit handles we hold
+                subprocess.Popen(
+                    args,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    close_fds=True,
+                )
             except Exception as e:
                 self.logger.terminal_print(f"Failed to open file explorer: {e}")
         else:
@@ -805,13 +989,14 @@ class GUI:
         Handle flashing for the specified side or firmware key, using pre-downloaded
         or online files.
         """
-        info = self.config_manager.get_firmware_info(firmware_key)
-        if not info:
+        if self._dialog_open:
+            return
+        filename = self.config_manager.get_firmware_filename(firmware_key)
+        if not filename:
             self.logger.terminal_print(
                 f"No firmware file found for direction: {firmware_key}"
             )
             return
-        filename = info["filename"]
 
         if self.updater.is_offline or not self.config_manager.is_online_status():
             self.logger.terminal_print(
@@ -826,12 +1011,24 @@ class GUI:
         """
         Prompts the user for a local .bin firmware file and flashes it.
         """
+        if self._dialog_open:
+            return
+        self._dialog_open = True
         self.logger.terminal_print("Offline mode: Select your local firmware .bin file.")
-        selected_file = filedialog.askopenfilename(
-            title="Select .bin file for flashing",
-            initialdir=self.main_folder,
-            filetypes=[("Firmware Binary", "*.bin"), ("All Files", "*.*")]
-        )
+        # Let the button release and pending repaints land before the native dialog blocks
+        self.root.update_idletasks()
+        self.root.after_idle(self._ask_flash_file)
+
+    def _ask_flash_file(self):
+        from tkinter import filedialog
+        try:
+            selected_file = filedialog.askopenfilename(
+                title="Select .bin file for flashing",
+                initialdir=self.main_folder,
+                filetypes=[("Firmware Binary", "*.bin"), ("All Files", "*.*")]
+            )
+        finally:
+            self._dialog_open = False
         if selected_file:
             self.logger.terminal_print(f"Selected firmware: {selected_file}")
             self.flasher.flash_local_bin(selected_file)
@@ -853,12 +1050,8 @@ class GUI:
         """
         if self.serial_handler.is_connected:
             if self.serial_handler.serial_connection and self.serial_handler.serial_connection.is_open:
-                try:
-                    serial_command = "km.move(50,50)\r"
-                    self.serial_handler.serial_connection.write(serial_command.encode())
-                    self.logger.terminal_print("Mouse move command sent, did mouse move?")
-                except Exception as e:
-                    self.logger.terminal_print(f"Error sending command: {e}")
+                self._tx_queue.put(self.TEST_MOVE_COMMAND)
+                self.logger.terminal_print("Mouse move command sent, did mouse move?")
             else:
                 self.logger.terminal_print("Serial connection is not open.")
         else:
@@ -896,8 +1089,13 @@ class GUI:
         """
         Hide the flash buttons.
         """
-        self.left_flash_button.grid_remove()
-        self.right_flash_button.grid_remove()
+        self._hide_if_built('left_flash_button', 'right_flash_button')
+
+    def _hide_if_built(self, *names):
+        for name in names:
+            widget = self._built(name)
+            if widget is not None:
+                widget.grid_remove()
 
     def fetch_and_display_welcome_message(self):
         """
@@ -919,6 +1117,7 @@ class GUI:
             return
         self.update_full_message()
         self.marquee_position = 0
+        self._last_marquee_ts = time.monotonic()
         self.animate_marquee()
 
     def animate_marquee(self):
@@ -927,35 +1126,50 @@ class GUI:
         """
         if not self.marquee_text:
             return
-        start_idx = self.marquee_position
-        end_idx = start_idx + self.display_length
-        visible_message = self.full_message[start_idx:end_idx]
-        if len(visible_message) < self.display_length:
-            visible_message += " " * (self.display_length - len(visible_message))
-        self.marquee_label.configure(text=visible_message)
-        total_length = len(self.marquee_text) + self.display_length
-        self.marquee_position = (self.marquee_position + 1) % total_length
+        if not self.marquee_label.winfo_viewable():
+            # Minimized or withdrawn: nothing to draw, check back at a slower rate
+            self.root.after(self.marquee_speed * 4, self.animate_marquee)
+            return
+        i = self.marquee_position
+        text = self._marquee_buf[i:i + self.display_length]
+        if text != self._last_marquee_text:
+            self.marquee_label.configure(text=text)
+            self._last_marquee_text = text
+        # Advance by wall-clock time so late ticks catch up instead of slowing the scroll
+        now = time.monotonic()
+        steps = max(1, int((now - self._last_marquee_ts) * 1000) // self.marquee_speed)
+        self._last_marquee_ts = now
+        self.marquee_position = (i + steps) % self._marquee_period
         self.root.after(self.marquee_speed, self.animate_marquee)
 
-    def update_full_message(self):
+    def update_full_message(self, display_length=None):
         """
         Recalculate the full message with minimal padding for smooth scrolling.
         """
-        self.display_length = self.get_display_length()
-        if self.display_length is None:
-            self.display_length = 50
+        if display_length is None:
+            display_length = self.get_display_length(refresh=True)
+        self.display_length = display_length
         self.full_message = self.marquee_text + " " * self.display_length
+        # Wrap the head onto the tail so every frame is a full-width slice
+        self._marquee_buf = self.full_message + self.full_message[:self.display_length]
+        self._marquee_period = len(self.full_message)
         self.marquee_position = 0
 
-    def get_display_length(self):
-        self.root.update_idletasks()
-        label_width = self.marquee_label.winfo_width()
-        font = tkfont.Font(font=self.marquee_label.cget("font"))
-        avg_char_width = font.measure("W")
-        if avg_char_width == 0:
+    def get_display_length(self, refresh=False):
+        """
+        Number of characters that fit in the marquee label. The glyph width is
+        measured once per label font; refresh forces pending geometry first.
+        """
+        if refresh:
+            self.root.update_idletasks()
+        spec = self.marquee_label.cget("font")
+        if spec is not self._marquee_font_spec:
+            font = spec if isinstance(spec, tkfont.Font) else tkfont.Font(font=spec)
+            self._marquee_char_w = font.measure("W")
+            self._marquee_font_spec = spec
+        if not self._marquee_char_w:
             return 50
-        calculated_length = max(int(label_width / avg_char_width), 10)
-        return calculated_length
+        return max(self.marquee_label.winfo_width() // self._marquee_char_w, 10)
 
     def set_offline_marquee(self):
         """
@@ -1000,9 +1214,10 @@ class GUI:
         self.history_dropdown.wm_overrideredirect(True)
         self.history_dropdown.configure(bg=self.dropdown_bg)
         self.root.update_idletasks()
+        # "WxH+x+y" gives both sizes in one call; the offsets are parent-relative, so root coords still come separately
+        input_width, input_height = map(int, self.text_input.winfo_geometry().split("+", 1)[0].split("x"))
         input_x = self.text_input.winfo_rootx()
-        input_y = self.text_input.winfo_rooty() + self.text_input.winfo_height()
-        input_width = self.text_input.winfo_width()
+        input_y = self.text_input.winfo_rooty() + input_height
         self.history_dropdown.wm_geometry(f"{input_width}x200+{input_x}+{input_y}")
         frame = tk.Frame(self.history_dropdown, bg=self.dropdown_bg, bd=1, relief="solid")
         frame.pack(fill="both", expand=True)
@@ -1013,26 +1228,44 @@ class GUI:
             bg=self.dropdown_bg,
             fg=self.dropdown_fg,
             selectbackground=self.dropdown_selected_bg,
-            font=("Helvetica", 12)
+            font=self._font
         )
-        for cmd in reversed(self.command_history):
-            self.history_listbox.insert(tk.END, cmd)
+        self.history_listbox.insert(tk.END, *reversed(self.command_history))
+        self._history_listed = self._history_appended
         self.history_listbox.pack(side="left", fill="both", expand=True)
         self.history_listbox.bind("<<ListboxSelect>>", self.on_history_select)
-        self.history_listbox.bind("<MouseWheel>", lambda event: self.history_listbox.yview_scroll(int(-1*(event.delta/120)), "units"))
-        self.history_listbox.bind("<Button-4>", lambda event: self.history_listbox.yview_scroll(-1, "units"))
-        self.history_listbox.bind("<Button-5>", lambda event: self.history_listbox.yview_scroll(1, "units"))
+        self.history_listbox.bind("<MouseWheel>", self._on_history_wheel)
+        self.history_listbox.bind("<Button-4>", self._on_history_scroll_up)
+        self.history_listbox.bind("<Button-5>", self._on_history_scroll_down)
         self.root.bind("<Button-1>", self.on_click_outside)
         self.history_listbox.focus_set()
 
+    def _on_history_wheel(self, event):
+        self.history_listbox.yview_scroll(int(-1*(event.delta/120)), "units")
+
+    def _on_history_scroll_up(self, event):
+        self.history_listbox.yview_scroll(-1, "units")
+
+    def _on_history_scroll_down(self, event):
+        self.history_listbox.yview_scroll(1, "units")
+
     def update_history_dropdown(self):
         """
         Update the history dropdown with the latest commands.
         """
         if self.history_dropdown and tk.Toplevel.winfo_exists(self.history_dropdown):
-            self.history_listbox.delete(0, tk.END)
-            for cmd in reversed(self.command_history):
-                self.history_listbox.insert(tk.END, cmd)
+            new = self._history_appended - self._history_listed
+            if new <= 0:
+                return
+            history = list(self.command_history)
+            if new >= len(history):
+                self.history_listbox.delete(0, tk.END)
+                self.history_listbox.insert(tk.END, *reversed(history))
+            else:
+                # Newest sits on top: push only the new commands, then drop what the deque evicted
+                self.history_listbox.insert(0, *reversed(history[-new:]))
+                self.history_listbox.delete(len(history), tk.END)
+            self._history_listed = self._history_appended
 
     def on_history_select(self, event):
         """
@@ -1077,18 +1310,21 @@ class GUI:
         Enable dragging the window by clicking and holding only on the marquee label.
         """
         def start_drag(event):
-            self.drag_start_x = event.x_root
-            self.drag_start_y = event.y_root
-            self.window_start_x = self.root.winfo_x()
-            self.window_start_y = self.root.winfo_y()
-    
+            # Window position minus pointer position; a motion just adds the pointer back
+            self._drag_offset_x = self.root.winfo_x() - event.x_root
+            self._drag_offset_y = self.root.winfo_y() - event.y_root
+
         def drag_window(event):
-            delta_x = event.x_root - self.drag_start_x
-            delta_y = event.y_root - self.drag_start_y
-            new_x = self.window_start_x + delta_x
-            new_y = self.window_start_y + delta_y
-            self.root.geometry(f"+{new_x}+{new_y}")
-    
+            self._drag_target = f"+{event.x_root + self._drag_offset_x}+{event.y_root + self._drag_offset_y}"
+            # Motion events outpace redraws; move the window once per idle pass
+            if not self._drag_pending:
+                self._drag_pending = True
+                self.root.after_idle(apply_drag)
+
+        def apply_drag():
+            self._drag_pending = False
+            self.root.geometry(self._drag_target)
+
         self.marquee_label.bind("<Button-1>", start_drag)
         self.marquee_label.bind("<B1-Motion>", drag_window)
 
@@ -1096,26 +1332,48 @@ class GUI:
         """
         Safely exit the application, ensuring all threads and connections are closed.
         """
+        if self.flasher.has_pending_work:
+            if self._quit_pending:
+                return
+            self._quit_pending = True
+            # Poll from the event loop so the window keeps painting until esptool finishes
+            self.logger.terminal_print("Flashing in progress. Please wait...")
+            self.root.after(100, self._quit_when_flash_done)
+            return
         try:
             self.save_window_position()
             self.serial_handler.monitoring_active = False
             self.serial_handler.stop_monitoring()
+            self.config_manager.close()
             self.logger.stop()
-            if self.flasher.is_flashing:
-                self.logger.terminal_print("Flashing in progress. Please wait...")
-                while self.flasher.is_flashing:
-                    time.sleep(0.1)
         except Exception as e:
             self.logger.terminal_print(f"Error during shutdown: {e}")
         finally:
             self.root.quit()
             self.root.destroy()
 
+    def _quit_when_flash_done(self):
+        if self.flasher.has_pending_work:
+            self.root.after(100, self._quit_when_flash_done)
+        else:
+            self._quit_pending = False
+            self.quit_application()
+
     def on_window_resize(self, event):
         """
         Handle window resize events to adjust marquee display length.
         """
-        new_display_length = self.get_display_length()
-        if new_display_length != self.display_length:
-            self.display_length = new_display_length
-            self.update_full_message()
\ No newline at end of file
+        if event.widget is self.root:
+            self._schedule_window_position_save()
+        if event.widget is not self.root and event.widget is not self.marquee_label:
+            return
+        # A drag-resize fires bursts of events; recompute once it settles
+        if self._resize_after_id is not None:
+            self.root.after_cancel(self._resize_after_id)
+        self._resize_after_id = self.root.after(self.RESIZE_DEBOUNCE_MS, self._apply_marquee_resize)
+
+    def _apply_marquee_resize(self):
+        self._resize_after_id = None
+        display_length = self.get_display_length()
+        if display_length != self.display_length:
+            self.update_full_message(display_length)
\ No newline at end of file
@@ -1,10 +1,15 @@
 # modules/logger.py
 
 import tkinter as tk
+import collections
 import threading
 import queue
+import time
 
 class Logger:
+    FILE_FLUSH_INTERVAL = 0.2  # Seconds between log file flushes
+    FILE_BUFFER_SIZE = 64 * 1024  # Large enough that only the timed flush hits the disk
+
     def __init__(self, text_widget, root, log_file_path=None):
         print("Initializing Logger with log_file_path:", log_file_path)  # Debugging statement
         """
@@ -16,18 +21,25 @@ class Logger:
         """
         self.text_widget = text_widget
         self.root = root
-        self.queue = queue.Queue()
+        self.queue = collections.deque()  # append/popleft are atomic, no lock needed
         self.running = True
         self.max_lines = 1000  # Maximum lines to keep in the textbox
+        self.trim_slack = 100  # Extra lines dropped per trim so trims stay infrequent
         self.update_scheduled = False  # Flag to prevent multiple scheduled updates
         self.text_widget.configure(state='disabled')  # Start as read-only
         self.line_count = 0  # Current number of lines in the textbox
 
         # Optional: Initialize log file
         self.log_file = None
+        self._file_q = None
+        self._file_thread = None
         if log_file_path:
             try:
-                self.log_file = open(log_file_path, 'a', encoding='utf-8')
+                self.log_file = open(log_file_path, 'a', encoding='utf-8', buffering=self.FILE_BUFFER_SIZE)
+                # Disk writes happen on their own thread so the Tk loop never waits on a flush
+                self._file_q = queue.Queue()
+                self._file_thread = threading.Thread(target=self._file_writer, name="log-writer", daemon=True)
+                self._file_thread.start()
                 self.terminal_print(f"Logging to file: {log_file_path}")
             except Exception as e:
                 self.terminal_print(f"Failed to open log file: {e}")
@@ -38,53 +50,103 @@ class Logger:
 
         :param message: The log message to display.
         """
-        self.queue.put(message)
+        self.queue.append(message)
+        if self._file_q is not None:
+            self._file_q.put(message)
         # Schedule the processing if not already scheduled
         if not self.update_scheduled:
             self.update_scheduled = True
             self.root.after(0, self.process_queue)
 
-        # Optional: Write to log file
-        if self.log_file:
-            try:
-                self.log_file.write(message + '\n')
-                self.log_file.flush()
-            except Exception as e:
-                self.terminal_print(f"Failed to write to log file: {e}")
-
     def process_queue(self):
         """
         Process all messages in the queue and update the Text widget.
         """
+        messages = []
         try:
-            while not self.queue.empty():
-                message = self.queue.get_nowait()
+            while True:
+                messages.append(self.queue.popleft())
+        except IndexError:
+            pass
+        if messages:
+            payload = "\n".join(messages) + "\n"
+            try:
+                # One insert/trim per drain instead of a Tcl round-trip per message
                 self.text_widget.configure(state='normal')
-                self.text_widget.insert(tk.END, message + '\n')
+                self.text_widget.insert(tk.END, payload)
+                self.line_count += payload.count("\n")
+
+                # Limit the number of lines to prevent slowdown
+                excess = self.line_count - self.max_lines
+                if excess > 0:
+                    excess = min(excess + self.trim_slack, self.line_count)
+                    self.text_widget.delete('1.0', f'{excess + 1}.0')
+                    self.line_count -= excess
                 self.text_widget.configure(state='disabled')
                 self.text_widget.see(tk.END)  # Auto-scroll to the end
-                self.line_count += 1
+            except Exception as e:
+                print(f"Logger update error: {e}")
 
-                # Limit the number of lines to prevent slowdown
-                if self.line_count > self.max_lines:
-                    self.text_widget.configure(state='normal')
-                    self.text_widget.delete('1.0', '2.0')  # Delete the first line
-                    self.text_widget.configure(state='disabled')
-                    self.line_count -= 1
-        except Exception as e:
-            print(f"Logger update error: {e}")
-        finally:
-            self.update_scheduled = False
-            # If new messages arrived during processing, schedule another update
-            if not self.queue.empty() and self.running:
-                self.update_scheduled = True
-                self.root.after(0, self.process_queue)
+        # Always clear-then-recheck, so a message enqueued while the flag was
+        # still set (even on an empty drain) gets its own update
+        self.update_scheduled = False
+        # If new messages arrived during processing, schedule another update
+        if self.queue and self.running:
+            self.update_scheduled = True
+            self.root.after(0, self.process_queue)
+
+    def _file_writer(self):
+        """
+        Background thread: append queued messages to the log file in batches,
+        flushing at most every FILE_FLUSH_INTERVAL seconds.
+        """
+        file_q = self._file_q
+        last_flush = time.monotonic()
+        dirty = False
+        while True:
+            try:
+                # While unflushed data is pending, wake up in time to flush it
+                batch = [file_q.get(timeout=self.FILE_FLUSH_INTERVAL if dirty else None)]
+            except queue.Empty:
+                batch = []
+            try:
+                while True:
+                    batch.append(file_q.get_nowait())
+            except queue.Empty:
+                pass
+            stopping = None in batch
+            if stopping:
+                batch = batch[:batch.index(None)]
+            try:
+                if batch:
+                    self.log_file.write("\n".join(batch) + "\n")
+                    dirty = True
+                now = time.monotonic()
+                if dirty and (stopping or now - last_flush >= self.FILE_FLUSH_INTERVAL):
+                    self.log_file.flush()
+                    last_flush = now
+                    dirty = False
+            except Exception as e:
+                # Give up on the file for good; with _file_q cleared this report
+                # only reaches the textbox and can't fail the same way again
+                self._file_q = None
+                print(f"Failed to write to log file: {e}")
+                self.terminal_print(f"Failed to write to log file: {e}")
+                return
+            if stopping:
+                return
 
     def stop(self):
         """
         Stop the logger's update loop and close the log file if it's open.
         """
         self.running = False
+        if self._file_thread is not None:
+            file_q, self._file_q = self._file_q, None
+            if file_q is not None:
+                file_q.put(None)
+            self._file_thread.join()
+            self._file_thread = None
         if self.log_file:
             try:
                 self.log_file.close()
@@ -1,8 +1,11 @@
 import serial
 import serial.tools.list_ports
 import threading
+import queue
 import time
+import re
 import struct
+from types import MappingProxyType
 
 class SerialHandler:
     KNOWN_DEVICES = [
@@ -11,6 +14,10 @@ class SerialHandler:
         {"vid": "303A", "pid": "0009", "mode": "Flash"},
         {"vid": "303A", "pid": "1001", "mode": "Flash"},
     ]
+    # (vid, pid) as pyserial reports them -> mode, in KNOWN_DEVICES priority order
+    KNOWN_DEVICE_IDS = MappingProxyType({(int(d["vid"], 16), int(d["pid"], 16)): d["mode"] for d in KNOWN_DEVICES})
+    PORTS_CACHE_TTL = 2.0  # seconds a comports() enumeration is reused
+    KEEPALIVE_INTERVAL = 1.0  # seconds between km.version() checks while connected
 
     GET_BAUD_RATE   = 0xA4
     SET_BAUD_RATE   = 0xA5
@@ -18,6 +25,16 @@ class SerialHandler:
     SET_DEV_LOG     = 0xA7
     LOG_HOST_TOGGLE = 0x96
 
+    # Start of either frame type: b'km.' text or the 0xDE 0xAD binary header
+    FRAME_HEADER = re.compile(rb'km\.|\xDE\xAD')
+    # 0xDE 0xAD header followed by the little-endian 16-bit size
+    FRAME_PREFIX = struct.Struct('<2sH')
+    KEEPALIVE_COMMAND = 'km.version()'
+    KEEPALIVE_REPLY_PREFIX = 'km.MAKCU'  # Only frames starting with this answer the keep-alive
+    # Exactly what send_command(KEEPALIVE_COMMAND) puts on the wire (size field = payload + 1)
+    KEEPALIVE_FRAME = FRAME_PREFIX.pack(b'\xDE\xAD', 1) + KEEPALIVE_COMMAND.encode()
+    MAX_PENDING_BYTES = 4 + 0xFFFF  # largest 0xDE 0xAD frame: header, size, 64 KiB payload
+
     def __init__(self, logger, update_mcu_status_callback, root):
         self.logger = logger
         self.update_mcu_status = update_mcu_status_callback
@@ -29,22 +46,43 @@ class SerialHandler:
         self.com_port = ""
         self.com_speed = 115200
         self.print_serial_data = True
+        self.log_tx = False  # Debug aid: echo outgoing 0xDE 0xAD frames as hex
         self.monitoring_active = False
         self.monitoring_thread = None
         self.serial_thread = None  # To handle serial communication
+        self.parser_thread = None  # Frames what serial_thread reads
+        self._rx_queue = queue.SimpleQueue()  # RX chunks, serial_thread -> parser_thread
         self.buffer = bytearray()
+        self._parse_cursor = 0
+        self.response_callback = None  # Receives the next decoded frame after send_command
+        self._pending_command = None
+        self._pending_prefix = None  # Expected reply prefix; None accepts the first non-echo frame
+        self._ports_cache = None
+        self._ports_ts = 0.0
         self.lock = threading.Lock()  # To prevent race conditions
         self.is_flashing = False      # Flag to indicate flashing status
-        self.flashing_lock = threading.Lock()  # Lock for flashing to prevent race conditions
+        self.flashing_event = threading.Event()  # Set while esptool owns the port
+        self._link_down = threading.Event()  # Set whenever no device is connected
+        self._link_down.set()
 
     def find_com_port(self, vid, pid):
         """Finds the COM port matching the given VID and PID."""
-        for port in serial.tools.list_ports.comports():
-            hwid = port.hwid.upper()
-            vid_pid = f"VID:PID={vid.upper()}:{pid.upper()}"
-            if vid_pid in hwid:
-                return port.device
-        return None
+        return self._ports_by_id().get((int(vid, 16), int(pid, 16)))
+
+    def _ports_by_id(self):
+        """
+        One enumeration, keyed by pyserial's parsed integer (vid, pid). Reused for
+        PORTS_CACHE_TTL seconds since a Windows PnP walk costs tens of ms.
+        """
+        now = time.monotonic()
+        if self._ports_cache is None or now - self._ports_ts > self.PORTS_CACHE_TTL:
+            self._ports_cache = {
+                (port.vid, port.pid): port.device
+                for port in serial.tools.list_ports.comports()
+                if port.vid is not None
+            }
+            self._ports_ts = now
+        return self._ports_cache
 
     def start_monitoring(self):
         """Starts monitoring for a serial connection."""
@@ -56,6 +94,8 @@ class SerialHandler:
             self.monitoring_active = True
             self.monitoring_thread = threading.Thread(target=self.monitor_ports, daemon=True)
             self.monitoring_thread.start()
+            self.parser_thread = threading.Thread(target=self.parse_worker, name="uart-parser", daemon=True)
+            self.parser_thread.start()
 
     def stop_monitoring(self):
         """Stops monitoring and disconnects if connected."""
@@ -65,6 +105,7 @@ class SerialHandler:
                 return
 
             self.monitoring_active = False
+        self._link_down.set()  # Wake the monitor thread if it is parked on a live link
 
         if self.serial_connection and self.serial_connection.is_open:
             self.close_connection()
@@ -74,21 +115,25 @@ class SerialHandler:
             if self.monitoring_thread.is_alive():
                 self.logger.terminal_print("Failed to fully stop monitoring thread.")
 
+        if self.parser_thread is not None:
+            self._rx_queue.put(None)
+            self.parser_thread.join(timeout=5)
+            self.parser_thread = None
+
     def monitor_ports(self):
         """Continuously scans for known devices and connects to them."""
         while self.monitoring_active:
-            if not self.is_connected:
-                # Wait here if flashing is in progress
-                with self.flashing_lock:
-                    for device in self.KNOWN_DEVICES:
-                        vid, pid, mode = device["vid"], device["pid"], device["mode"]
-                        com_port = self.find_com_port(vid, pid)
-                        if com_port:
-                            self.auto_connect(com_port, mode)
-                            break  # Exit loop once connected
-            elif self.is_connected:
-                # Send km.version() command for keep-alive check with callback
-                self.send_command('km.version()', callback=self.handle_version_response)
+            if self.is_connected:
+                # The RX thread owns keep-alive while connected; park until the link drops
+                self._link_down.wait()
+                continue
+            if not self.flashing_event.is_set():  # Leave the port to the flasher meanwhile
+                ports = self._ports_by_id()
+                for device_id, mode in self.KNOWN_DEVICE_IDS.items():
+                    com_port = ports.get(device_id)
+                    if com_port:
+                        self.auto_connect(com_port, mode)
+                        break  # Exit loop once connected
 
             time.sleep(1)  # Avoid busy-waiting
 
@@ -97,26 +142,13 @@ class SerialHandler:
          """
          Handle the response to the km.version() command.
          """
-         if response == "km.MAKCU\n\r>>>":
+         if response.startswith(self.KEEPALIVE_REPLY_PREFIX):
              # Update MCU status only if the response is correct
              self.update_mcu_status()
          else:
              self.logger.terminal_print("Invalid response received during keep-alive check.")
     
             
-    def read_response(self):
-        """
-        Reads the response from the MCU and invokes the callback if set.
-        """
-        if self.response_callback:
-            response = self.buffer.decode('utf-8', errors='ignore')
-            # Call the callback with the response
-            self.response_callback(response)
-            # Clear the callback after use
-            self.response_callback = None
-
-
-
     def auto_connect(self, com_port, mode, baudrate=115200, retry_attempts=5, retry_delay=2):
         attempt = 0
         while attempt < retry_attempts and not self.is_connected:
@@ -129,6 +161,7 @@ class SerialHandler:
                     stopbits=serial.STOPBITS_ONE,
                     bytesize=serial.EIGHTBITS
                 )
+                self._link_down.clear()
                 self.is_connected = True
                 self.serial_open = True
                 self.com_speed = baudrate
@@ -145,89 +178,141 @@ class SerialHandler:
             self.logger.terminal_print(f"Unable to connect to {com_port} after {retry_attempts} attempts.")
 
     def serial_communication_thread(self):
-        """Handles serial communication while connected."""
+        """Handles serial communication while connected, including the 1 s keep-alive."""
+        last_keepalive = time.monotonic()
         while self.monitoring_active and self.is_connected and self.serial_open:
             try:
-                if self.serial_connection and self.serial_connection.is_open:
-                    bytes_to_read = self.serial_connection.in_waiting
-                    if bytes_to_read > 0:
-                        data = self.serial_connection.read(bytes_to_read)
-                        if data:
-                            self.handle_incoming_data(data)
+                connection = self.serial_connection
+                if connection and connection.is_open:
+                    now = time.monotonic()
+                    if now - last_keepalive >= self.KEEPALIVE_INTERVAL and not self.flashing_event.is_set():
+                        # Send km.version() command for keep-alive check with callback
+                        self._send_keepalive(connection)
+                        last_keepalive = now
+                    # Block in the driver until a byte arrives (or the port timeout
+                    # lapses, so shutdown flags are still re-checked), then take
+                    # whatever else is already waiting
+                    first = connection.read(1)
+                    if first:
+                        waiting = connection.in_waiting
+                        if waiting:
+                            self._rx_queue.put(first)
+                            self._rx_queue.put(connection.read(waiting))
+                        else:
+                            self._rx_queue.put(first)
+                else:
+                    time.sleep(0.1)
             except Exception as e:
                 # self.logger.terminal_print(f"Serial communication error: {e}")
                 self.handle_disconnect()
                 break
-            time.sleep(0.1)
 
-    def parse_uart_frames(self, data):
+    def parse_uart_frames(self, data, resume=0):
         """
         Parses incoming UART data to handle frames starting with 'km.' or 0xDE, 0xAD.
+        Returns how many leading bytes were consumed; anything after that is an
+        incomplete frame (or header) to keep for the next read. `resume` is how far a
+        previous call already searched an unterminated 'km.' frame at offset 0.
         """
+        length = len(data)
         index = 0
-        while index < len(data):
-            # Handle 'km.' frames
-            if data[index:index + 3] == b'km.':
-                end_index = data.find(b'\r', index)
-                if end_index != -1:  # Full frame found
-                    frame = data[index:end_index + 1]  # Include '\r'
-                    self.logger.terminal_print(frame.decode('utf-8', errors='ignore'))
+        # The view is released on exit so the caller can still resize the bytearray
+        with memoryview(data) as view:
+            while True:
+                # One C-level scan for whichever header comes first
+                match = self.FRAME_HEADER.search(data, index)
+                if match is None:
+                    # No more headers; only a header split across reads is worth keeping
+                    if data.endswith(b'km'):
+                        return max(index, length - 2)
+                    if data.endswith(b'k') or data.endswith(b'\xDE'):
+                        return max(index, length - 1)
+                    return length
+                index = match.start()
+
+                # Handle 'km.' frames
+                if data[index] == 0x6B:
+                    end_index = data.find(b'\r', max(index + 3, resume))
+                    if end_index == -1:
+                        return index  # Incomplete frame, wait for more data
+                    self._deliver_frame(str(view[index:end_index + 1], 'utf-8', 'ignore'))  # Include '\r'
                     index = end_index + 1  # Move past the end of the frame
+
+                # Handle 0xDE, 0xAD frames
                 else:
-                    break  # Incomplete frame, wait for more data
-                
-            # Handle 0xDE, 0xAD frames
-            elif data[index:index + 2] == b'\xDE\xAD':
-                if index + 4 <= len(data):
-                    size = struct.unpack('<H', data[index + 2:index + 4])[0]  # Frame size
+                    if index + 4 > length:
+                        return index  # Incomplete frame header, wait for more data
+                    size = int.from_bytes(view[index + 2:index + 4], 'little')  # Frame size
                     end_index = index + 4 + size
-                    if end_index <= len(data):  # Full frame available
-                        frame = data[index + 4:end_index]  # Extract the actual payload
-                        try:
-                            decoded_frame = frame.decode('utf-8', errors='ignore')
-                            self.logger.terminal_print(decoded_frame)
-                        except Exception as e:
-                            self.logger.terminal_print(f"Error decoding frame: {e}")
-                        index = end_index  # Move past the end of the frame
-                    else:
-                        break  # Incomplete frame, wait for more data
-                else:
-                    break  # Incomplete frame header, wait for more data
-                
-            else:
-                # Skip to the next potential header
-                next_km = data.find(b'km.', index + 1)
-                next_dead = data.find(b'\xDE\xAD', index + 1)
-    
-                if next_km == -1 and next_dead == -1:
-                    break  # No more potential headers
-                
-                # Jump to the closest header
-                if next_km == -1:
-                    index = next_dead
-                elif next_dead == -1:
-                    index = next_km
-                else:
-                    index = min(next_km, next_dead)
-
-    def handle_incoming_data(self, data):
+                    if end_index > length:
+                        return index  # Incomplete frame, wait for more data
+                    self._deliver_frame(str(view[index + 4:end_index], 'utf-8', 'ignore'))
+                    index = end_index  # Move past the end of the frame
+
+    def _deliver_frame(self, text):
+        """Print a decoded frame and hand it to a pending response callback."""
+        self.logger.terminal_print(text)
+        callback = self.response_callback
+        if callback is None:
+            return
+        stripped = text.strip()
+        if stripped == self._pending_command:
+            return  # Just the device echoing the command back
+        prefix = self._pending_prefix
+        if prefix is not None and not stripped.startswith(prefix):
+            return  # Unsolicited log frame; keep waiting for the real reply
+        self.response_callback = None
+        self._pending_command = None
+        self._pending_prefix = None
+        callback(text)
+
+    def handle_incoming_data(self, *chunks):
         """
         Handles incoming UART data by appending it to a buffer and parsing frames.
+        Accepts one or more chunks (bytes, bytearray or memoryview) read back to back.
+        Only the parser thread calls this, so the buffer needs no lock.
         """
-        with self.lock:
+        for data in chunks:
             self.buffer.extend(data)  # Add new data to the buffer
+        try:
+            consumed = self.parse_uart_frames(self.buffer, self._parse_cursor)
+        except Exception as e:
+            self.logger.terminal_print(f"Error parsing UART frames: {e}")
+            consumed = len(self.buffer)
+        # Trim processed data in place; a partial frame stays for the next read
+        del self.buffer[:consumed]
+        if len(self.buffer) > self.MAX_PENDING_BYTES:
+            # A frame that never completes (e.g. 'km.' without '\r') must not grow forever
+            self.buffer.clear()
+        # What is left has been scanned already; a trickling frame resumes from here
+        self._parse_cursor = len(self.buffer)
+
+    def parse_worker(self):
+        """
+        Parser thread: frames, prints and dispatches whatever the RX thread queued,
+        so reads never wait on parsing or logging. A None item stops it.
+        """
+        while True:
+            chunks = [self._rx_queue.get()]
             try:
-                self.parse_uart_frames(self.buffer)
-            except Exception as e:
-                self.logger.terminal_print(f"Error parsing UART frames: {e}")
-            finally:
-                # Trim processed data
-                self.buffer = self.buffer[len(self.buffer):]
+                while True:
+                    chunks.append(self._rx_queue.get_nowait())
+            except queue.Empty:
+                pass
+            stopping = None in chunks
+            if stopping:
+                chunks = chunks[:chunks.index(None)]
+            if chunks:
+                self.handle_incoming_data(*chunks)
+            if stopping:
+                return
 
     def handle_disconnect(self):
         self.logger.terminal_print("Device disconnected.")
         self.is_connected = False
         self.serial_open = False
+        self._link_down.set()
+        self._ports_cache = None  # the port list just changed; rescan on the next tick
 
         if self.serial_connection:
             try:
@@ -240,11 +325,22 @@ class SerialHandler:
 
         self.root.after(0, self.update_mcu_status)  # Thread-safe update
 
+    @staticmethod
+    def _cancel_read(connection):
+        cancel_read = getattr(connection, "cancel_read", None)
+        if cancel_read is not None:
+            try:
+                cancel_read()
+            except Exception:
+                pass
+
     def close_connection(self):
         try:
             if self.serial_connection and self.serial_connection.is_open:
                 self.write_to_serial("DEBUG_OFF\n")
                 time.sleep(0.5)
+                # Wake the RX thread out of its blocking read before the port goes away
+                self._cancel_read(self.serial_connection)
                 self.serial_connection.close()
         except Exception as e:
             self.logger.terminal_print(f"Error while closing serial connection: {e}")
@@ -252,6 +348,8 @@ class SerialHandler:
             self.serial_connection = None
             self.is_connected = False
             self.serial_open = False
+            self._link_down.set()
+            self._ports_cache = None
             self.root.after(0, self.update_mcu_status)  # Thread-safe update
 
     def toggle_serial_printing(self, state):
@@ -260,25 +358,30 @@ class SerialHandler:
 
     def set_flashing(self, status: bool):
         """
-        Sets the flashing status and locks/unlocks flashing_lock accordingly.
-        Prevents double-acquire or double-release.
+        Sets the flashing status; port scanning pauses while it is set.
+        Safe to call repeatedly or from different threads.
         """
         if status:
-            if not self.flashing_lock.locked():
-                self.flashing_lock.acquire()
-            self.is_flashing = True
+            self.flashing_event.set()
         else:
-            if self.flashing_lock.locked():
-                self.flashing_lock.release()
-            self.is_flashing = False
+            self.flashing_event.clear()
+        self.is_flashing = status
     
 
+    @classmethod
+    def _frame(cls, size, data):
+        """0xDE 0xAD header, 16-bit size (LSB, MSB), then data, built in one buffer."""
+        payload = bytearray(4 + len(data))
+        cls.FRAME_PREFIX.pack_into(payload, 0, b'\xDE\xAD', size & 0xFFFF)
+        payload[4:] = data
+        return payload
+
     def write_to_serial(self, data):
         """
         Enforces a header frame of [0xDE, 0xAD],
         followed by a 16-bit payload size (LSB then MSB),
         and then the actual data payload (UTF-8 encoded if str).
-        Also logs the hex bytes being sent.
+        Logs the hex bytes being sent when log_tx is enabled.
         """
         if not self.serial_connection or not self.serial_connection.is_open:
             self.logger.terminal_print("Attempted to write but serial is not open.")
@@ -288,15 +391,11 @@ class SerialHandler:
             data = data.encode("utf-8")
 
         # Prepare header + size + data
-        header = bytes([0xDE, 0xAD])
-        size = len(data)
-        lsb = size & 0xFF
-        msb = (size >> 8) & 0xFF
-        payload = header + bytes([lsb, msb]) + data
+        payload = self._frame(len(data), data)
 
         # Log the hex being sent
-        payload_hex = " ".join(f"{b:02X}" for b in payload)
-        #self.logger.terminal_print(f"TX (auto-size) => {payload_hex}")
+        if self.log_tx:
+            self.logger.terminal_print(f"TX (auto-size) => {payload.hex(' ').upper()}")
 
         try:
             self.serial_connection.write(payload)
@@ -315,10 +414,7 @@ class SerialHandler:
         if isinstance(data, str):
             data = data.encode("utf-8")
     
-        header = bytes([0xDE, 0xAD])
-        lsb = size & 0xFF
-        msb = (size >> 8) & 0xFF
-        payload = header + bytes([lsb, msb]) + data
+        payload = self._frame(size, data)
     
         try:
             self.serial_connection.write(payload)
@@ -326,10 +422,13 @@ class SerialHandler:
             self.logger.terminal_print(f"Error while writing to serial: {e}")
     
 
-    def send_command(self, command, payload=b"", callback=None):
+    def send_command(self, command, payload=b"", callback=None, response_prefix=None):
         """
         Generalized method to send a command with optional payload and an optional callback.
+        With response_prefix set, only a frame starting with it is treated as the reply.
         """
+        self._pending_command = command if callback else None
+        self._pending_prefix = response_prefix if callback else None
         self.response_callback = callback  # Store the callback to call once the response is processed
 
         size = len(payload) + 1  # 1 byte for the command itself
@@ -337,6 +436,16 @@ class SerialHandler:
         data = bytes(command, 'utf-8') + payload  # Convert command to bytes
         self.write_to_serial_with_size(size, data)
 
+    def _send_keepalive(self, connection):
+        """send_command('km.version()') with the frame prebuilt once at class load."""
+        self._pending_command = self.KEEPALIVE_COMMAND
+        self._pending_prefix = self.KEEPALIVE_REPLY_PREFIX
+        self.response_callback = self.handle_version_response
+        try:
+            connection.write(self.KEEPALIVE_FRAME)
+        except Exception as e:
+            self.logger.terminal_print(f"Error while writing to serial: {e}")
+
     def get_baud_rate(self):
         """
         Sends a command to retrieve the current baud rate.
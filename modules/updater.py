@@ -1,14 +1,16 @@
+import functools
 import requests
+from requests.adapters import HTTPAdapter
 import threading
 import subprocess
 import os
 import time
 import sys
 import hashlib
-import json
 import re
 
 from modules.utils import get_main_folder
+from modules.config_manager import json_loads
 
 
 class Updater:
@@ -21,14 +23,23 @@ class Updater:
     """
     PRIMARY_UPDATE_BASE_URL = "https://github.com/terrafirma2021/MAKCM_v2_files/raw/refs/heads/main/MAKCU.exe"
     FALLBACK_UPDATE_BASE_URL = "https://gitee.com/terrafirma/MAKCM_v2_files/raw/main/MAKCU.exe"
+    DOWNLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB per iter_content step
     def __init__(self, logger, config_manager, flasher=None):
         self.logger = logger
         self.config_manager = config_manager
         self.flasher = flasher
         self.main_folder = get_main_folder()
-        self.current_version = self._get_current_version()
         self.update_check_complete = threading.Event()
         self.is_offline = False
+        # Pooled keep-alive connections; a retry against the same host skips the TLS handshake
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+    @functools.cached_property
+    def current_version(self):
+        # Resolved on the update worker thread (before it waits for the config
+        # download), so the config.json read stays off GUI construction
+        return self._get_current_version()
 
     def _get_current_version(self):
         """Determine the version of the currently running build.
@@ -49,11 +60,11 @@ class Updater:
         # 1. Try the local config.json
         config_path = os.path.join(self.main_folder, "config.json")
         try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                version = str(data.get("version", "")).strip()
-                if version:
-                    return version
+            with open(config_path, "rb") as f:
+                data = json_loads(f.read())
+            version = str(data.get("version", "")).strip()
+            if version:
+                return version
         except Exception:
             pass
 
@@ -78,6 +89,9 @@ class Updater:
                 current_fw = self.config_manager.get_config_value("firmware", {})
                 current_firmware_left = current_fw.get("left", {}).get("version", "")
                 current_firmware_right = current_fw.get("right", {}).get("version", "")
+                # Snapshot the running version before the refresh: ConfigManager
+                # rewrites the same config.json with the remote version
+                current_version = self.current_version
 
                 # Ensure config is downloaded before any checks
                 self.config_manager.wait_until_downloaded()
@@ -99,8 +113,6 @@ class Updater:
                     self.logger.terminal_print("Latest version not specified in configuration.")
                     self.update_check_complete.set()
                     return
-        
-                current_version = self.current_version
 
                 # Log version details for debugging
                 self.logger.terminal_print(f"Current version: {current_version!r}  Latest version: {latest_version!r}")
@@ -242,45 +254,63 @@ class Updater:
         Returns True if successful, False otherwise.
         Tracks the server used for a successful download and logs download progress.
         """
+        response = None
         try:
             self.logger.terminal_print(f"Starting download from {server_name} server: {url}")
-            response = requests.get(url, stream=True, timeout=30)
+            response = self._session.get(url, stream=True, timeout=30)
             response.raise_for_status()
 
             # Get total file size for progress tracking
             total_size = int(response.headers.get('content-length', 0))
             self.logger.terminal_print(f"File size: {total_size} bytes")
             downloaded_size = 0
-            chunk_size = 8192
+            chunk_size = self.DOWNLOAD_CHUNK_SIZE
+            # Hash while streaming so the file never has to be read back
+            sha256 = hashlib.sha256()
+            report_step = max(total_size // 10, 1)
+            next_report = report_step
 
-            with open(destination, 'wb') as f:
+            with open(destination, 'wb', buffering=chunk_size) as f:
                 start_time = time.time()
                 for chunk in response.iter_content(chunk_size=chunk_size):
                     if chunk:
+                        sha256.update(chunk)
                         f.write(chunk)
                         downloaded_size += len(chunk)
                         # Log progress every ~10% or at completion
                         if total_size > 0:
-                            progress = (downloaded_size / total_size) * 100
-                            if downloaded_size == total_size or (downloaded_size % (total_size // 10) < chunk_size):
+                            if downloaded_size >= next_report or downloaded_size == total_size:
+                                progress = (downloaded_size / total_size) * 100
                                 self.logger.terminal_print(f"Download progress: {progress:.1f}% ({downloaded_size}/{total_size} bytes)")
+                                # Fixed 10% marks; a chunk spanning several marks logs once
+                                next_report += report_step * ((downloaded_size - next_report) // report_step + 1)
                         else:
                             self.logger.terminal_print(f"Downloaded chunk: {downloaded_size} bytes")
+                # Durable before we launch it, and (where supported) not left
+                # occupying page cache that the running app would rather keep
+                f.flush()
+                os.fsync(f.fileno())
+                if hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
 
             end_time = time.time()
             self.logger.terminal_print(f"Download completed in {end_time - start_time:.2f} seconds")
             self.logger.terminal_print(f"File saved to: {destination}")
 
-            # Verify file integrity with size and a simple hash
+            # Verify file integrity with size and, when config.json publishes one, the SHA-256
             if os.path.exists(destination):
                 file_size = os.path.getsize(destination)
                 self.logger.terminal_print(f"Downloaded file size: {file_size} bytes")
                 if file_size == 0:
                     self.logger.terminal_print("Error: Downloaded file is empty")
                     return False
-                with open(destination, 'rb') as f:
-                    file_hash = hashlib.md5(f.read()).hexdigest()
-                    self.logger.terminal_print(f"File MD5 hash: {file_hash}")
+                file_hash = sha256.hexdigest()
+                self.logger.terminal_print(f"File SHA-256 hash: {file_hash}")
+                expected_hash = str(self.config_manager.get_config_value("exe_sha256", "") or "").strip().lower()
+                if expected_hash and file_hash != expected_hash:
+                    self.logger.terminal_print(f"Error: SHA-256 mismatch, expected {expected_hash}. Discarding download.")
+                    os.remove(destination)
+                    return False
             else:
                 self.logger.terminal_print(f"Error: File not found at {destination}")
                 return False
@@ -291,4 +321,8 @@ class Updater:
             return True
         except Exception as e:
             self.logger.terminal_print(f"Failed to download from {server_name} server: {e}")
-            return False
\ No newline at end of file
+            return False
+        finally:
+            # Hand the connection back to the pool even if the body wasn't fully read
+            if response is not None:
+                response.close()
\ No newline at end of file
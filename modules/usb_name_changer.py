@@ -1,64 +1,412 @@
 import winreg
 import ctypes
+from ctypes import wintypes
 import sys
 import serial.tools.list_ports
 import os
 import signal
 import subprocess
-from colorama import init, Fore
 import threading
+import queue
 import time
-import win32com.client
-import pythoncom
+from functools import lru_cache
 
 from modules.utils import get_driver_path
 
-init()
-
 VID = 0x1A86
 PID = 0x55D3
 DEFAULT_NAME = "USB-Enhanced-SERIAL CH343"
 TARGET_DESC = "USB-SERIAL CH340"
 MAX_NAME_LENGTH = 40
+NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+WBEM_FLAG_RETURN_IMMEDIATELY = 0x10
+WBEM_FLAG_FORWARD_ONLY = 0x20
+CH343_REGISTRY_PROBES = (
+    r"SYSTEM\DriverDatabase\DriverInfFiles\ch343ser.inf",  # Staged in the driver store
+    r"SYSTEM\CurrentControlSet\Services\CH343SER_A64",
+    r"SYSTEM\CurrentControlSet\Services\CH343SER",
+)
+PORTS_CACHE_TTL = 1.0  # Seconds one comports() enumeration is reused for
+ERROR_SUCCESS = 0
+RRF_RT_REG_SZ = 0x00000002
+INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+REG_VALUE_BUFFER_CHARS = 256  # Fits any FriendlyName we write (MAX_NAME_LENGTH) with room to spare
+GUID_DEVINTERFACE_COMPORT = "{86E0D1E0-8089-11D0-9CE4-08002BE10318}"
+DBT_DEVICEARRIVAL = 0x8000
+DBT_DEVICEREMOVECOMPLETE = 0x8004
+
+_ports_cache = None  # (monotonic timestamp, [ListPortInfo, ...])
+
+
+def _cached_comports(ttl=PORTS_CACHE_TTL):
+    """
+    comports() goes through SetupAPI and is slow on Windows; back-to-back
+    lookups (connected check, then device info) share one enumeration.
+    """
+    global _ports_cache
+    cached = _ports_cache
+    now = time.monotonic()
+    if cached and now - cached[0] < ttl:
+        return cached[1]
+    ports = list(serial.tools.list_ports.comports())
+    _ports_cache = (now, ports)
+    return ports
+
+
+def _ch343_registry_present():
+    """
+    True if the CH343 driver is known to Windows: its service key exists
+    (created once a device has used it) or the INF is in the driver store.
+    """
+    for key_path in CH343_REGISTRY_PROBES:
+        try:
+            winreg.CloseKey(winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path, 0, winreg.KEY_READ))
+            return True
+        except OSError:
+            continue
+    return False
+
+
+@lru_cache(maxsize=1)
+def _advapi32():
+    """advapi32 with prototypes for the registry calls winreg doesn't expose."""
+    lib = ctypes.WinDLL("advapi32", use_last_error=True)
+    lib.RegGetValueW.argtypes = (
+        wintypes.HKEY, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
+        wintypes.LPDWORD, ctypes.c_void_p, wintypes.LPDWORD,
+    )
+    lib.RegGetValueW.restype = wintypes.LONG
+    lib.RegSetKeyValueW.argtypes = (
+        wintypes.HKEY, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
+        ctypes.c_void_p, wintypes.DWORD,
+    )
+    lib.RegSetKeyValueW.restype = wintypes.LONG
+    lib.RegOpenKeyTransactedW.argtypes = (
+        wintypes.HKEY, wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD,
+        ctypes.POINTER(wintypes.HKEY), wintypes.HANDLE, ctypes.c_void_p,
+    )
+    lib.RegOpenKeyTransactedW.restype = wintypes.LONG
+    lib.RegCloseKey.argtypes = (wintypes.HKEY,)
+    lib.RegCloseKey.restype = wintypes.LONG
+    return lib
+
+
+@lru_cache(maxsize=1)
+def _ktmw32():
+    """Kernel Transaction Manager entry points used for atomic registry writes."""
+    lib = ctypes.WinDLL("ktmw32", use_last_error=True)
+    lib.CreateTransaction.argtypes = (
+        ctypes.c_void_p, ctypes.c_void_p, wintypes.DWORD, wintypes.DWORD,
+        wintypes.DWORD, wintypes.DWORD, wintypes.LPWSTR,
+    )
+    lib.CreateTransaction.restype = wintypes.HANDLE
+    lib.CommitTransaction.argtypes = (wintypes.HANDLE,)
+    lib.CommitTransaction.restype = wintypes.BOOL
+    lib.RollbackTransaction.argtypes = (wintypes.HANDLE,)
+    lib.RollbackTransaction.restype = wintypes.BOOL
+    return lib
+
+
+@lru_cache(maxsize=1)
+def _kernel32():
+    """Private kernel32 instance so CloseHandle gets a HANDLE prototype (no int truncation)."""
+    lib = ctypes.WinDLL("kernel32", use_last_error=True)
+    lib.CloseHandle.argtypes = (wintypes.HANDLE,)
+    lib.CloseHandle.restype = wintypes.BOOL
+    return lib
+
+
+def _reg_get_sz(hkey, subkey, value_name):
+    """
+    REG_SZ value of hkey\\subkey, or None if it can't be read. Callers only
+    use this to skip redundant writes, so any failure just means "write it".
+    """
+    buf = ctypes.create_unicode_buffer(REG_VALUE_BUFFER_CHARS)
+    size = wintypes.DWORD(ctypes.sizeof(buf))
+    rc = _advapi32().RegGetValueW(hkey, subkey, value_name, RRF_RT_REG_SZ, None, buf, ctypes.byref(size))
+    return buf.value if rc == ERROR_SUCCESS else None
+
+
+def _reg_set_sz(hkey, subkey, value_name, data):
+    """Write a REG_SZ under hkey\\subkey in one call (the open/close happens in the kernel)."""
+    buf = ctypes.create_unicode_buffer(data)
+    rc = _advapi32().RegSetKeyValueW(hkey, subkey, value_name, winreg.REG_SZ, buf, ctypes.sizeof(buf))
+    if rc != ERROR_SUCCESS:
+        raise ctypes.WinError(rc)
+
+
+def _write_friendly_names(hkey, subkey_names, friendly_name):
+    """Per-instance writes, each naming the child relative to the parent handle."""
+    for name in subkey_names:
+        # An unchanged write still hits the hive and fires PnP notifications
+        if _reg_get_sz(hkey, name, "FriendlyName") != friendly_name:
+            _reg_set_sz(hkey, name, "FriendlyName", friendly_name)
+
+
+def _begin_transaction():
+    """
+    A new KTM transaction handle, or None when KTM itself is unavailable
+    (ktmw32 won't load or CreateTransaction is refused; it's deprecated).
+    """
+    try:
+        txn = _ktmw32().CreateTransaction(None, None, 0, 0, 0, 0, None)
+    except (OSError, AttributeError):
+        return None
+    if txn in (None, INVALID_HANDLE_VALUE):
+        return None
+    return txn
+
+
+def _write_friendly_names_transacted(txn, hkey, subkey_names, friendly_name):
+    """
+    Same as _write_friendly_names, but inside the KTM transaction `txn`: every
+    instance is renamed or none is, and the hive is flushed once at commit.
+    Takes ownership of `txn`; any failure rolls back and propagates.
+    """
+    advapi32, ktmw32 = _advapi32(), _ktmw32()
+    committed = False
+    try:
+        pending = 0
+        for name in subkey_names:
+            child = wintypes.HKEY()
+            rc = advapi32.RegOpenKeyTransactedW(
+                hkey, name, 0, winreg.KEY_QUERY_VALUE | winreg.KEY_SET_VALUE | winreg.KEY_WOW64_64KEY,
+                ctypes.byref(child), txn, None,
+            )
+            if rc != ERROR_SUCCESS:
+                raise ctypes.WinError(rc)
+            try:
+                if _reg_get_sz(child, None, "FriendlyName") != friendly_name:
+                    _reg_set_sz(child, None, "FriendlyName", friendly_name)
+                    pending += 1
+            finally:
+                advapi32.RegCloseKey(child)
+        if pending and not ktmw32.CommitTransaction(txn):
+            raise ctypes.WinError(ctypes.get_last_error())
+        committed = True
+    finally:
+        if not committed:
+            ktmw32.RollbackTransaction(txn)
+        _kernel32().CloseHandle(txn)
+
+
+def invalidate_ports_cache():
+    """Drop the cached enumeration after the device set has changed."""
+    global _ports_cache
+    _ports_cache = None
+
+
+# Presence pushed by WM_DEVICECHANGE: "VID_xxxx&PID_xxxx" -> bool. Every COM port
+# arrival/removal clears it and bumps the generation, so a read between events
+# is a dict hit and the first read after one re-enumerates.
+_presence = {}
+_presence_gen = 0
+_presence_lock = threading.Lock()
+_device_watch_active = False
+_device_watch_lock = threading.Lock()
+_device_watch_started = False
+
+
+def _start_device_watch():
+    """Start the shared device-notification thread once; a no-op afterwards."""
+    global _device_watch_started
+    with _device_watch_lock:
+        if _device_watch_started:
+            return
+        _device_watch_started = True
+    threading.Thread(target=_device_watch_loop, name="usb-watch", daemon=True).start()
+
+
+def _on_device_change(hwnd, msg, wparam, lparam):
+    global _presence_gen
+    if wparam in (DBT_DEVICEARRIVAL, DBT_DEVICEREMOVECOMPLETE):
+        with _presence_lock:
+            _presence_gen += 1
+            _presence.clear()
+        invalidate_ports_cache()
+    return True
+
+
+def _device_watch_loop():
+    """
+    Message-only window registered for COM port interface notifications.
+    Ports are watched rather than raw USB devices: an FTDI port lives under
+    FTDIBUS, and a USB arrival can land before its COM port exists.
+    """
+    global _device_watch_active
+    try:
+        import win32api
+        import win32con
+        import win32gui
+        import win32gui_struct
+
+        wc = win32gui.WNDCLASS()
+        wc.lpfnWndProc = {win32con.WM_DEVICECHANGE: _on_device_change}
+        wc.lpszClassName = "MAKCUDeviceWatch"
+        wc.hInstance = win32api.GetModuleHandle(None)
+        atom = win32gui.RegisterClass(wc)
+        hwnd = win32gui.CreateWindow(atom, "", 0, 0, 0, 0, 0, win32con.HWND_MESSAGE, 0, wc.hInstance, None)
+        win32gui.RegisterDeviceNotification(
+            hwnd,
+            win32gui_struct.PackDEV_BROADCAST_DEVICEINTERFACE(GUID_DEVINTERFACE_COMPORT),
+            win32con.DEVICE_NOTIFY_WINDOW_HANDLE,
+        )
+    except Exception as e:
+        # Presence checks keep enumerating ports; slower but always correct
+        print(f"Device notifications unavailable, falling back to polling: {e}")
+        return
+    _device_watch_active = True
+    win32gui.PumpMessages()
+    _device_watch_active = False
+
+
+_wmi_jobs = queue.SimpleQueue()
+_wmi_thread = None
+_wmi_thread_lock = threading.Lock()
+_wmi_services = None  # Only touched on the WMI worker thread
+
+
+def _submit_wmi_job(job):
+    """
+    Run job() on the shared WMI worker thread, starting it on first use.
+    Raises (and leaves no worker behind) if the thread can't initialize COM,
+    so callers never queue work that nothing will pick up.
+    """
+    global _wmi_thread
+    with _wmi_thread_lock:
+        if _wmi_thread is None:
+            ready = threading.Event()
+            startup = {}
+            thread = threading.Thread(target=_wmi_worker, args=(ready, startup), name="wmi-worker", daemon=True)
+            thread.start()
+            ready.wait()
+            if "error" in startup:
+                raise startup["error"]
+            _wmi_thread = thread
+    _wmi_jobs.put(job)
+
+
+def _wmi_worker(ready, startup):
+    """
+    COM objects belong to the thread that created them, so a single thread
+    initializes COM once and keeps the WMI connection for every job.
+    """
+    try:
+        # pywin32's COM modules are heavy; only load them once a reinstall is requested
+        import pythoncom
+        pythoncom.CoInitialize()
+    except Exception as e:
+        startup["error"] = e
+        return
+    finally:
+        ready.set()
+    while True:
+        job = _wmi_jobs.get()
+        try:
+            job()
+        except Exception as e:
+            print(f"WMI job failed: {e}")
+
+
+def _get_wmi_services():
+    """Connected root\\cimv2 services object, bound once and reused."""
+    global _wmi_services
+    if _wmi_services is None:
+        import win32com.client
+        _wmi_services = win32com.client.GetObject("winmgmts:\\\\.\\root\\cimv2")
+    return _wmi_services
+
+
+def _reset_wmi_services():
+    """Forget the connection so the next job rebinds (e.g. after Winmgmt restarted)."""
+    global _wmi_services
+    _wmi_services = None
+
 
 class USBNameChanger:
-    def __init__(self, logger, is_admin_func):
+    NEEDS_CH343_DRIVER = True  # Probe for (and install) the bundled CH343 driver
+    DRIVER_PROBE_TIMEOUT = 5.0  # Seconds ensure_driver_installed waits for the probe
+    REMOVE_WAIT_TIMEOUT = 5.0  # Max seconds to wait for the port to vanish after pnputil
+    REMOVE_POLL_INTERVAL = 0.1  # Seconds between presence checks while waiting
+
+    def __init__(self, logger, is_admin_func, vid=VID, pid=PID,
+                 default_name=DEFAULT_NAME, target_desc=TARGET_DESC):
         self.logger = logger
         self.is_admin = is_admin_func
-        self.vid = VID
-        self.pid = PID
-        self.target_desc = TARGET_DESC
-        self.default_name = DEFAULT_NAME
+        self.vid = vid
+        self.pid = pid
+        self.target_desc = target_desc
+        self.default_name = default_name
         self.max_name_length = MAX_NAME_LENGTH
         self.driver_checked = False
+        self._derive_device_keys()
+        _start_device_watch()
+        self._driver_lock = threading.Lock()
+        self._driver_ready = threading.Event()
+        self._driver_installed = False
+        if self.NEEDS_CH343_DRIVER:
+            # Probe off the caller's thread so constructing the changer never blocks the GUI
+            threading.Thread(target=self._probe_driver_background, name="driver-probe", daemon=True).start()
+        else:
+            self._driver_installed = True
+            self._driver_ready.set()
+
+    def _derive_device_keys(self):
+        """Registry path and WMI query for this VID/PID, built once instead of per call."""
+        self._vid_pid_substr = f"VID_{self.vid:04X}&PID_{self.pid:04X}"
+        self._usb_enum_key_path = f"SYSTEM\\CurrentControlSet\\Enum\\USB\\{self._vid_pid_substr}"
+        # Anchored on the USB enumerator (no leading %) and projected to the
+        # fields we use, so WMI doesn't scan and marshal every PnP entity
+        self._wmi_query = (
+            "SELECT DeviceID, Name FROM Win32_PnPEntity "
+            f"WHERE DeviceID LIKE 'USB\\\\{self._vid_pid_substr}%'"
+        )
 
     def is_device_connected(self):
-        ports = serial.tools.list_ports.comports()
-        for port in ports:
+        if _device_watch_active:
+            cached = _presence.get(self._vid_pid_substr)
+            if cached is not None:
+                return cached
+        gen = _presence_gen
+        connected = False
+        for port in _cached_comports():
             if port.vid == self.vid and port.pid == self.pid:
-                return True
-        return False
+                connected = True
+                break
+        # Only cache if no arrival/removal landed while we were enumerating
+        if _device_watch_active:
+            with _presence_lock:
+                if gen == _presence_gen:
+                    _presence[self._vid_pid_substr] = connected
+        return connected
 
     def get_device_info(self):
-        ports = serial.tools.list_ports.comports()
+        ports = _cached_comports()
         for port in ports:
             if port.vid == self.vid and port.pid == self.pid:
                 return port.description or "Unknown", port.device
         return None, None
 
     def update_registry_name(self, new_name, com_port=None):
-        key_path = f"SYSTEM\\CurrentControlSet\\Enum\\USB\\VID_{self.vid:04X}&PID_{self.pid:04X}"
+        key_path = self._usb_enum_key_path
         friendly_name = new_name[:self.max_name_length]
 
         try:
-            key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path, 0, winreg.KEY_ALL_ACCESS)
-            for i in range(winreg.QueryInfoKey(key)[0]):
-                subkey_name = winreg.EnumKey(key, i)
-                subkey_path = f"{key_path}\\{subkey_name}"
-                subkey = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, subkey_path, 0, winreg.KEY_ALL_ACCESS)
-                winreg.SetValueEx(subkey, "FriendlyName", 0, winreg.REG_SZ, friendly_name)
-                winreg.CloseKey(subkey)
-            winreg.CloseKey(key)
+            # The parent is only enumerated; children are opened per call with the rights they need
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path, 0,
+                                winreg.KEY_READ | winreg.KEY_WOW64_64KEY) as key:
+                n_sub = winreg.QueryInfoKey(key)[0]
+                subkey_names = [winreg.EnumKey(key, i) for i in range(n_sub)]
+                txn = _begin_transaction()
+                if txn is None:
+                    # No KTM on this system: plain per-instance writes are all we have
+                    _write_friendly_names(key.handle, subkey_names, friendly_name)
+                else:
+                    # Errors inside the transaction roll back and surface below, rather
+                    # than retrying non-atomically and leaving a half-renamed device
+                    _write_friendly_names_transacted(txn, key.handle, subkey_names, friendly_name)
+            # Port descriptions come from FriendlyName; don't serve the old one
+            invalidate_ports_cache()
             return True
         except Exception as e:
             self.logger.terminal_print(f"Registry update failed: {e}. Try running as Administrator.")
@@ -87,51 +435,63 @@ class USBNameChanger:
             return False
 
         #self.logger.terminal_print("Reinstalling device to restore original CH343 name...")
-        threading.Thread(target=self._reinstall_device, daemon=True).start()
+        try:
+            _submit_wmi_job(self._reinstall_device)
+        except Exception as e:
+            self.logger.terminal_print(f"Device reinstall error (COM init): {e}")
+            return False
         return True
 
     def _reinstall_device(self):
+        """Runs on the WMI worker thread (see _submit_wmi_job)."""
         try:
             #self.logger.terminal_print("Reinstalling device to restore original CH343 name...")
 
-            pythoncom.CoInitialize()
-            wmi = win32com.client.GetObject("winmgmts:")
-
-            query = f"SELECT * FROM Win32_PnPEntity WHERE DeviceID LIKE '%VID_{self.vid:04X}&PID_{self.pid:04X}%'"
-            devices = wmi.ExecQuery(query)
+            wmi = _get_wmi_services()
 
-            if not devices:
-                self.logger.terminal_print("No matching devices found in WMI.")
-                return
+            # Forward-only semi-sync results can't be counted, so track matches while iterating
+            devices = wmi.ExecQuery(self._wmi_query, "WQL", WBEM_FLAG_FORWARD_ONLY | WBEM_FLAG_RETURN_IMMEDIATELY)
 
+            found = False
             for device in devices:
+                found = True
                 #self.logger.terminal_print(f"Found device: {device.Name}")
                 device_id = device.DeviceID
 
                 try:
-                    quoted_id = f'"{device_id}"'
                     #self.logger.terminal_print(f"Removing device: {device_id}")
 
+                    # argv list, no shell: the instance ID's '&' and '\' reach pnputil verbatim
                     subprocess.run(
-                        f'pnputil /remove-device {quoted_id}',
+                        ["pnputil", "/remove-device", device_id],
                         stdout=subprocess.DEVNULL,
                         stderr=subprocess.DEVNULL,
-                        shell=True
+                        creationflags=NO_WINDOW
                     )
 
-                    time.sleep(3)
+                    # Prompt as soon as the port is gone instead of after a fixed 3 s
+                    deadline = time.monotonic() + self.REMOVE_WAIT_TIMEOUT
+                    while time.monotonic() < deadline:
+                        invalidate_ports_cache()
+                        if not self.is_device_connected():
+                            break
+                        time.sleep(self.REMOVE_POLL_INTERVAL)
                     self.logger.terminal_print("Please physically replug the USB device to complete re-enumeration.")
                     return
 
                 except Exception as inner:
                     self.logger.terminal_print(f"Error uninstalling device: {inner}")
 
+            if not found:
+                self.logger.terminal_print("No matching devices found in WMI.")
+
         except Exception as e:
+            _reset_wmi_services()
             self.logger.terminal_print(f"Device reinstall error (WMI): {e}")
 
 
     def list_usb_devices(self):
-        ports = serial.tools.list_ports.comports()
+        ports = _cached_comports()
         dev_list = []
         for port in ports:
             vid = f"{port.vid:04X}" if port.vid else "N/A"
@@ -141,24 +501,37 @@ class USBNameChanger:
         return dev_list
 
     def is_ch343_driver_installed(self):
+        if _ch343_registry_present():
+            return True
+        # Registry miss isn't conclusive on every Windows build; confirm via
+        # pnputil, filtered to the Ports class so the listing stays small
         try:
             result = subprocess.run(
-                ["pnputil", "/enum-drivers"],
+                ["pnputil", "/enum-drivers", "/class", "Ports"],
                 capture_output=True,
                 text=True,
-                shell=True
+                creationflags=NO_WINDOW
             )
             output = result.stdout.upper()
             return "CH343SER.INF" in output or "CH343" in output
         except Exception:
             return False
 
+    def _probe_driver_background(self):
+        try:
+            self._driver_installed = self.is_ch343_driver_installed()
+        finally:
+            self._driver_ready.set()
+
     def ensure_driver_installed(self):
-        if self.driver_checked:
-            return True
-        self.driver_checked = True
+        with self._driver_lock:
+            if self.driver_checked:
+                return True
+            self.driver_checked = True
 
-        if self.is_ch343_driver_installed():
+        # A timed-out probe counts as missing; re-adding an installed driver is harmless
+        self._driver_ready.wait(timeout=self.DRIVER_PROBE_TIMEOUT)
+        if self._driver_installed:
             return True
 
         if not self.is_admin():
@@ -173,7 +546,7 @@ class USBNameChanger:
                 ["pnputil", "/add-driver", inf_path, "/install"],
                 capture_output=True,
                 text=True,
-                shell=True
+                creationflags=NO_WINDOW
             )
 
             if result.returncode in (0, 3010):
@@ -190,9 +563,12 @@ class USBNameChanger:
 
 
 class USBNameChangerFTDI(USBNameChanger):
+    NEEDS_CH343_DRIVER = False
+
     def __init__(self, logger, is_admin_func):
-        super().__init__(logger, is_admin_func)
-        self.vid = 0x0403
-        self.pid = 0x6001
-        self.default_name = "USB Serial Port"
-        self.target_desc = "USB-SERIAL CH340"
+        # target_desc stays the CH340-style name: that's what the toggle renames FTDI adapters to
+        super().__init__(
+            logger, is_admin_func,
+            vid=0x0403, pid=0x6001,
+            default_name="USB Serial Port", target_desc=TARGET_DESC,
+        )
@@ -2,6 +2,7 @@
 
 import os
 import sys
+from functools import lru_cache
 from pathlib import Path
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -11,11 +12,13 @@ from pathlib import Path
 #  - Write/download only next to the EXE (or project root in dev).
 # ─────────────────────────────────────────────────────────────────────────────
 
+@lru_cache(maxsize=1)
 def _is_frozen() -> bool:
     """True when running under PyInstaller onefile/onedir."""
     return bool(getattr(sys, "frozen", False)) and hasattr(sys, "_MEIPASS")
 
 
+@lru_cache(maxsize=1)
 def app_dir() -> Path:
     """
     Directory where we want to WRITE things (logs, downloads, etc.).
@@ -28,6 +31,7 @@ def app_dir() -> Path:
     return Path(__file__).resolve().parent.parent
 
 
+@lru_cache(maxsize=1)
 def bundle_dir() -> Path:
     """
     Directory where READ-only bundled resources live.
@@ -39,6 +43,13 @@ def bundle_dir() -> Path:
     return app_dir()
 
 
+# Resolved once; the bundle location can't change within a process
+_BUNDLE_DIR = bundle_dir()
+_ASSETS_DIR = os.path.join(str(_BUNDLE_DIR.resolve()), "assets")
+_DRIVER_DIR = os.path.join(_ASSETS_DIR, "driver")
+
+
+@lru_cache(maxsize=1)
 def get_main_folder() -> str:
     """
     Kept for backward compatibility with existing calls.
@@ -52,23 +63,35 @@ def ensure_dir(p: Path) -> None:
     p.parent.mkdir(parents=True, exist_ok=True)
 
 
+@lru_cache(maxsize=256)
 def resource_path(rel: str) -> str:
     """
     Build an absolute path to a bundled resource that was included via --add-data.
+    Only found paths are cached; a missing resource raises and is re-checked next call.
     Example:
         icon = resource_path("assets/icons/app.ico")
         driver = resource_path("assets/driver/CH343S64.SYS")
     """
-    abs_path = (bundle_dir() / rel).resolve()
+    abs_path = (_BUNDLE_DIR / rel).resolve()
     if not abs_path.exists():
         # Helpful error with both attempted location and frozen status
         raise FileNotFoundError(
             f"Bundled resource not found: {abs_path}\n"
-            f"(frozen={_is_frozen()}, bundle_dir={bundle_dir()})"
+            f"(frozen={_is_frozen()}, bundle_dir={_BUNDLE_DIR})"
         )
     return str(abs_path)
 
 
+def get_download_dir() -> str:
+    """
+    The 'downloads' folder alongside the EXE (or project root in dev).
+    Created if missing.
+    """
+    target = (app_dir() / "downloads").resolve()
+    target.mkdir(parents=True, exist_ok=True)
+    return str(target)
+
+
 def get_download_path(filename: str) -> str:
     """
     Place downloaded/created files alongside the EXE (or project root in dev),
@@ -83,14 +106,27 @@ def get_download_path(filename: str) -> str:
 # Convenience wrappers used throughout the codebase
 # ─────────────────────────────────────────────────────────────────────────────
 
+def _bundled_file(directory: str, filename: str) -> str:
+    """Join against a pre-resolved bundle subdir; plain string ops, one stat."""
+    path = os.path.join(directory, filename)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(
+            f"Bundled resource not found: {path}\n"
+            f"(frozen={_is_frozen()}, bundle_dir={_BUNDLE_DIR})"
+        )
+    return path
+
+
+@lru_cache(maxsize=None)
 def get_icon_path(filename: str) -> str:
     """
     Return full path to an icon or any file inside /assets when bundled.
     Example: get_icon_path("app.ico") -> <bundle>/assets/app.ico
     """
-    return resource_path(str(Path("assets") / filename))
+    return _bundled_file(_ASSETS_DIR, filename)
 
 
+@lru_cache(maxsize=None)
 def get_driver_path(filename: str | None = None) -> str:
     """
     Return full path to driver directory or a specific driver file inside /assets/driver.
@@ -98,17 +134,15 @@ def get_driver_path(filename: str | None = None) -> str:
         get_driver_path() -> <bundle>/assets/driver
         get_driver_path("CH343S64.SYS") -> <bundle>/assets/driver/CH343S64.SYS
     """
-    base = Path("assets") / "driver"
     if filename:
-        return resource_path(str(base / filename))
+        return _bundled_file(_DRIVER_DIR, filename)
     # Return the directory path (ensure it exists)
-    dir_path = (bundle_dir() / base).resolve()
-    if not dir_path.exists():
+    if not os.path.isdir(_DRIVER_DIR):
         raise FileNotFoundError(
-            f"Driver folder not found: {dir_path}\n"
-            f"(frozen={_is_frozen()}, bundle_dir={bundle_dir()})"
+            f"Driver folder not found: {_DRIVER_DIR}\n"
+            f"(frozen={_is_frozen()}, bundle_dir={_BUNDLE_DIR})"
         )
-    return str(dir_path)
+    return _DRIVER_DIR
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -118,6 +152,7 @@ def get_driver_path(filename: str | None = None) -> str:
 def setup_custom_temp_folder() -> str:
     """
     Deprecated: copying sys._MEIPASS content into a custom temp dir is unnecessary.
-    Kept only to avoid crashes if older code calls it. Returns bundle_dir().
+    Kept only to avoid crashes if older code calls it. Nothing is copied;
+    returns the bundle dir itself (sys._MEIPASS when frozen).
     """
-    return str(bundle_dir())
+    return str(_BUNDLE_DIR)